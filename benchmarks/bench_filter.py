@@ -0,0 +1,52 @@
+"""Compare the per-pattern fnmatch loop with the compiled FilterMatcher.
+
+Usage: python benchmarks/bench_filter.py [names] [patterns]
+"""
+import fnmatch
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ipyfilechooser.utils import FilterMatcher  # noqa: E402
+
+
+def fnmatch_loop(item, filter_pattern):
+    """The previous match_item implementation."""
+    idx = 0
+    found = False
+
+    while idx < len(filter_pattern) and not found:
+        found |= fnmatch.fnmatch(item.lower(), filter_pattern[idx].lower())
+        idx += 1
+
+    return found
+
+
+def main():
+    num_names = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    num_patterns = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    extensions = [f'ext{i}' for i in range(num_patterns * 2)]
+    names = [f'File_{i:06d}.{extensions[i % len(extensions)]}' for i in range(num_names)]
+    patterns = [f'*.{ext}' for ext in extensions[:num_patterns]]
+
+    def run_loop():
+        return sum(1 for name in names if fnmatch_loop(name, patterns))
+
+    def run_matcher():
+        matcher = FilterMatcher(patterns)
+        return sum(1 for name in names if matcher(name))
+
+    assert run_loop() == run_matcher()
+    loop_time = min(timeit.repeat(run_loop, number=1, repeat=3))
+    matcher_time = min(timeit.repeat(run_matcher, number=1, repeat=3))
+
+    print(f'{num_names} names x {num_patterns} patterns')
+    print(f'fnmatch loop:   {loop_time * 1000:8.1f} ms')
+    print(f'FilterMatcher:  {matcher_time * 1000:8.1f} ms')
+    print(f'speedup:        {loop_time / matcher_time:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Count the widget comm messages sent per FileChooser navigation.
+
+Front-end changes are simulated with set_state, so the counts include the echo
+and index correction messages ipywidgets sends back for them. The per-navigation
+budgets are checked by tests/test_comm_messages.py.
+
+Usage: python benchmarks/comm_messages.py [path]
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ipywidgets import Widget  # noqa: E402
+from ipyfilechooser import FileChooser  # noqa: E402
+
+
+@contextmanager
+def count_messages():
+    """Count the messages widgets send to the front-end while the block runs."""
+    sent = []
+    send = Widget._send
+
+    def _send(widget, msg, buffers=None):
+        sent.append((type(widget).__name__, sorted(msg.get('state', {}))))
+
+    Widget._send = _send
+
+    try:
+        yield sent
+    finally:
+        Widget._send = send
+
+
+def make_tree(root):
+    """Create a small folder tree to navigate."""
+    os.makedirs(os.path.join(root, 'sub', 'deeper'))
+
+    for i in range(20):
+        open(os.path.join(root, f'file{i}.txt'), 'w').close()
+        open(os.path.join(root, 'sub', f'file{i}.txt'), 'w').close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = sys.argv[1] if len(sys.argv) > 1 else tmp
+
+        if len(sys.argv) == 1:
+            make_tree(root)
+
+        fc = FileChooser(root)
+        fc._show_dialog()
+        listing = fc._model.listing
+        subdir = next(name for name in listing.names if name != os.pardir and listing.entry_is_dir(name))
+
+        # set_state applies changes the way front-end messages do, without echoing them back
+        operations = [
+            ('open subfolder', lambda: fc._dircontent.set_state({
+                'index': fc._dircontent.options.index(listing.display_name(listing.index(subdir)))
+            })),
+            ('go to parent', lambda: fc._pathlist.set_state({'index': 1})),
+            ('type filename', lambda: fc._filename.set_state({'value': 'file1.txt'})),
+            ('refresh', fc.refresh),
+            ('reset', fc.reset),
+        ]
+
+        for name, operation in operations:
+            with count_messages() as sent:
+                operation()
+
+            print(f'{name:16} {len(sent):3} messages')
+
+            for widget, keys in sent:
+                print(f'{"":16}     {widget}: {", ".join(keys)}')
+
+
+if __name__ == '__main__':
+    main()
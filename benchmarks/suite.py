@@ -0,0 +1,372 @@
+"""Benchmark suite for FileChooser navigation latency, syscalls and comm traffic.
+
+Generates synthetic folder trees and reports, per tree and operation, the
+median wall time, the number of stat and listdir/scandir calls, the peak
+traced memory, the traced memory still held afterwards and the number of comm
+messages sent.
+
+Usage:
+    python benchmarks/suite.py [--quick] [--repeat N] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import ipyfilechooser  # noqa: E402
+from ipyfilechooser import FileChooser, FileChooserModel  # noqa: E402
+from ipyfilechooser.backends import MemoryBackend  # noqa: E402
+from ipyfilechooser.utils import get_dir_contents  # noqa: E402
+from comm_messages import count_messages  # noqa: E402
+
+PATTERNS = [f'*.ext{i}' for i in range(20)]
+
+
+def _touch(path):
+    open(path, 'w').close()
+
+
+def make_flat(root, count):
+    """A folder with count files and a few subfolders."""
+    for i in range(count):
+        _touch(os.path.join(root, f'file_{i:06d}.ext{i % 40}'))
+
+    for i in range(max(1, count // 100)):
+        os.mkdir(os.path.join(root, f'dir_{i:04d}'))
+
+    return root
+
+
+def make_deep(root, depth=50):
+    """A chain of nested folders, returning the deepest one."""
+    path = root
+
+    for i in range(depth):
+        path = os.path.join(path, f'level_{i:02d}')
+        os.mkdir(path)
+        _touch(os.path.join(path, 'data.txt'))
+
+    return path
+
+
+def make_symlinks(root, count=1000):
+    """A folder whose entries are mostly symlinks to files and folders."""
+    target = os.path.join(root, 'targets')
+    view = os.path.join(root, 'view')
+    os.mkdir(target)
+    os.mkdir(view)
+
+    for i in range(count):
+        if i % 2:
+            os.mkdir(os.path.join(target, f'dir_{i:05d}'))
+            os.symlink(os.path.join(target, f'dir_{i:05d}'), os.path.join(view, f'link_dir_{i:05d}'))
+        else:
+            _touch(os.path.join(target, f'file_{i:05d}.txt'))
+            os.symlink(os.path.join(target, f'file_{i:05d}.txt'), os.path.join(view, f'link_file_{i:05d}.txt'))
+
+    return view
+
+
+def make_hidden(root, count=5000):
+    """A folder where most entries are hidden."""
+    for i in range(count):
+        _touch(os.path.join(root, f'.hidden_{i:05d}'))
+
+    for i in range(count // 50):
+        _touch(os.path.join(root, f'visible_{i:05d}.txt'))
+
+    return root
+
+
+def make_memory(count):
+    """An in-memory folder with count files, measuring the widget without filesystem costs."""
+    backend = MemoryBackend()
+
+    for i in range(count):
+        backend.add_file(f'/memory/file_{i:06d}.ext{i % 40}')
+
+    return backend
+
+
+def age_tree(root):
+    """Backdate folder mtimes so the listing cache accepts them right away."""
+    past = time.time() - 60
+
+    for path, _, _ in os.walk(root):
+        os.utime(path, (past, past))
+
+
+class CountingEntry:
+    """os.DirEntry proxy counting the stat calls the entry makes.
+
+    Entries know their own type from the scan, so is_dir() and is_file() only stat symlinks, and each entry
+    fetches its stat and lstat at most once.
+    """
+
+    def __init__(self, entry, counts):
+        self._entry = entry
+        self._counts = counts
+        self._fetched = set()
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def __fspath__(self):
+        return self._entry.path
+
+    def _fetch(self, follow_symlinks):
+        # A stat that follows a non-symlink is its lstat
+        kind = 'stat' if follow_symlinks and self._entry.is_symlink() else 'lstat'
+
+        if kind not in self._fetched:
+            self._fetched.add(kind)
+            self._counts['stat'] += 1
+
+    def stat(self, *, follow_symlinks=True):
+        self._fetch(follow_symlinks)
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def is_dir(self, *, follow_symlinks=True):
+        if follow_symlinks and self._entry.is_symlink():
+            self._fetch(True)
+
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, *, follow_symlinks=True):
+        if follow_symlinks and self._entry.is_symlink():
+            self._fetch(True)
+
+        return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+
+class CountingScandir:
+    """os.scandir iterator proxy yielding CountingEntry objects."""
+
+    def __init__(self, iterator, counts):
+        self._iterator = iterator
+        self._counts = counts
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return CountingEntry(next(self._iterator), self._counts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._iterator.close()
+
+
+@contextmanager
+def count_syscalls():
+    """Count stat and listdir/scandir calls made while the block runs, including those of scandir entries."""
+    counts = {'stat': 0, 'listdir': 0}
+    originals = {name: getattr(os, name) for name in ('stat', 'lstat', 'listdir', 'scandir')}
+
+    def wrap(name, kind):
+        original = originals[name]
+
+        def wrapper(*args, **kwargs):
+            counts[kind] += 1
+            return original(*args, **kwargs)
+
+        return wrapper
+
+    def scandir(*args, **kwargs):
+        counts['listdir'] += 1
+        return CountingScandir(originals['scandir'](*args, **kwargs), counts)
+
+    os.stat = wrap('stat', 'stat')
+    os.lstat = wrap('lstat', 'stat')
+    os.listdir = wrap('listdir', 'listdir')
+    os.scandir = scandir
+
+    try:
+        yield counts
+    finally:
+        for name, original in originals.items():
+            setattr(os, name, original)
+
+
+def measure(operation, repeat):
+    """Run an operation and collect wall time, syscalls, peak and retained memory and comm messages."""
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        times.append(time.perf_counter() - start)
+
+    with count_syscalls() as syscalls, count_messages() as sent:
+        operation()
+
+    tracemalloc.start()
+    operation()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'wall_ms': statistics.median(times) * 1000,
+        'stat_calls': syscalls['stat'],
+        'listdir_calls': syscalls['listdir'],
+        'peak_kib': peak / 1024,
+        'retained_kib': retained / 1024,
+        'comm_messages': len(sent)
+    }
+
+
+def toggle(fc, name):
+    """Flip a boolean property twice so every run starts from the same state."""
+    def operation():
+        setattr(fc, name, not getattr(fc, name))
+        setattr(fc, name, not getattr(fc, name))
+
+    return operation
+
+
+def operations(path, filter_pattern, backend=None):
+    """Build the operations measured for one tree."""
+    fc = FileChooser(path, filter_pattern=filter_pattern, backend=backend)
+    fc._show_dialog()
+    # The same navigation without widgets, sharing the chooser's listing cache
+    model = FileChooserModel(path, filter_pattern=filter_pattern, backend=backend)
+
+    def navigate_cold():
+        fc.invalidate_cache()
+        fc._set_form_values(path, '')
+
+    opened = []
+
+    def open_dialog():
+        # A chooser with its own cache, kept open so its listing and scan count as retained memory
+        opened.clear()
+        opened.append(FileChooser(path, filter_pattern=filter_pattern, backend=backend, shared_cache=False))
+        opened[0]._show_dialog()
+
+    measured = [
+        ('open_dialog', open_dialog),
+        ('navigate_cold', navigate_cold),
+        ('navigate_warm', lambda: fc._set_form_values(path, '')),
+        ('model_navigate_warm', lambda: model.navigate(path)),
+        ('refresh', fc.refresh),
+        ('set_show_hidden', toggle(fc, 'show_hidden')),
+        ('set_dir_icon_append', toggle(fc, 'dir_icon_append')),
+        ('set_filter_pattern', lambda: setattr(fc, 'filter_pattern', filter_pattern or ['*.ext1'])),
+        # Last, as it closes the dialog
+        ('reset', fc.reset),
+    ]
+
+    # get_dir_contents always reads the local filesystem
+    if backend is None:
+        measured.insert(0, ('get_dir_contents', lambda: get_dir_contents(path, filter_pattern=filter_pattern)))
+
+    return measured
+
+
+def build_trees(root, quick):
+    """Create the synthetic trees, returning (name, path, filter_pattern, backend) tuples."""
+    sizes = [10, 1000] if quick else [10, 1000, 100000]
+    trees = []
+
+    for size in sizes:
+        trees.append((f'flat_{size}', make_flat(_mkdir(root, f'flat_{size}'), size), None, None))
+
+    trees.append(('deep_50', make_deep(_mkdir(root, 'deep')), None, None))
+    trees.append(('symlinks_1000', make_symlinks(_mkdir(root, 'symlinks')), None, None))
+    trees.append(('hidden_5000', make_hidden(_mkdir(root, 'hidden')), None, None))
+    trees.append(('filter_20_patterns', make_flat(_mkdir(root, 'filtered'), 1000 if quick else 10000), PATTERNS, None))
+    trees.append((f'memory_{sizes[-1]}', '/memory', None, make_memory(sizes[-1])))
+    age_tree(root)
+
+    return trees
+
+
+def _mkdir(root, name):
+    """Create a folder below root."""
+    path = os.path.join(root, name)
+    os.mkdir(path)
+
+    return path
+
+
+def compare(results, baseline_file):
+    """Print the ratio of each metric against a previous run."""
+    with open(baseline_file) as f:
+        baseline = {(r['tree'], r['operation']): r for r in json.load(f)['results']}
+
+    print(f'\nCompared to {baseline_file} (new / old):')
+
+    for result in results:
+        old = baseline.get((result['tree'], result['operation']))
+
+        if old is None:
+            continue
+
+        ratios = []
+
+        for key in ('wall_ms', 'stat_calls', 'listdir_calls', 'peak_kib', 'retained_kib', 'comm_messages'):
+            if key not in old:
+                continue
+
+            if old[key]:
+                ratios.append(f'{key}={result[key] / old[key]:.2f}')
+            else:
+                ratios.append(f'{key}={result[key]}/0' if result[key] else f'{key}=1.00')
+
+        print(f'{result["tree"]:20} {result["operation"]:20} {" ".join(ratios)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='skip the 100k entry tree')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per operation')
+    parser.add_argument('--output', help='write the results to a JSON file')
+    parser.add_argument('--compare', help='compare against a previous JSON results file')
+    args = parser.parse_args()
+    results = []
+
+    with tempfile.TemporaryDirectory() as root:
+        for tree, path, filter_pattern, backend in build_trees(root, args.quick):
+            for operation, run in operations(path, filter_pattern, backend):
+                result = {'tree': tree, 'operation': operation}
+                result.update(measure(run, args.repeat))
+                results.append(result)
+                print(
+                    f'{tree:20} {operation:20} {result["wall_ms"]:10.2f} ms '
+                    f'{result["stat_calls"]:7} stat {result["listdir_calls"]:4} listdir '
+                    f'{result["peak_kib"]:10.1f} KiB peak {result["retained_kib"]:10.1f} KiB held '
+                    f'{result["comm_messages"]:3} msg'
+                )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'version': ipyfilechooser.__version__,
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'repeat': args.repeat
+                },
+                'results': results
+            }, f, indent=2)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
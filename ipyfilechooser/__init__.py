@@ -1,3 +1,13 @@
-from .filechooser import FileChooser
+from .model import FileChooserModel
 
 __version__ = '0.6.0'
+__all__ = ['FileChooser', 'FileChooserModel']
+
+
+def __getattr__(name: str):
+    # Import the widget on first use so the model can be used without loading ipywidgets
+    if name == 'FileChooser':
+        from .filechooser import FileChooser
+        return FileChooser
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
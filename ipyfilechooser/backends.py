@@ -0,0 +1,326 @@
+"""Filesystem backends used to list and inspect folders."""
+import os
+import posixpath
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+from .utils import get_stat_key, scan_dir, scan_dir_batches, scan_dir_metadata
+
+# (name, is_dir, size, mtime_ns), with None for unknown values
+MetadataRow = Tuple[str, bool, Optional[int], Optional[int]]
+
+
+class FileSystemBackend:
+    """Base class for the filesystem operations FileChooser relies on."""
+
+    def scandir(self, path: str) -> List[Tuple[str, bool]]:
+        """Read a folder and return (name, is_dir) tuples."""
+        raise NotImplementedError
+
+    def scandir_batches(self, path: str, batch_size: int = 1000) -> Iterator[List[Tuple[str, bool]]]:
+        """Read a folder and yield (name, is_dir) tuples in batches."""
+        entries = self.scandir(path)
+
+        for start in range(0, len(entries), batch_size):
+            yield entries[start:start + batch_size]
+
+    def scandir_metadata(self, path: str) -> List[MetadataRow]:
+        """Read a folder and return (name, is_dir, size, mtime_ns) tuples."""
+        return [(name, is_dir, None, None) for name, is_dir in self.scandir(path)]
+
+    def stat_key(self, path: str) -> Hashable:
+        """Get a value that changes whenever the folder contents change, raising OSError if it is gone."""
+        raise NotImplementedError
+
+    def can_cache(self, key: Hashable) -> bool:
+        """Check if a listing taken under a stat key can be trusted until the key changes."""
+        return True
+
+    def realpath(self, path: str) -> str:
+        """Get the canonical form of a path."""
+        raise NotImplementedError
+
+    def isdir(self, path: str) -> bool:
+        """Check if a path is a folder."""
+        raise NotImplementedError
+
+    def isfile(self, path: str) -> bool:
+        """Check if a path is a file."""
+        raise NotImplementedError
+
+
+class LocalBackend(FileSystemBackend):
+    """The local filesystem."""
+
+    # Folders modified this recently (in seconds) are not cached, as a
+    # change within the same mtime tick would go unnoticed.
+    _RACY_WINDOW = 1.0
+
+    def scandir(self, path: str) -> List[Tuple[str, bool]]:
+        """Read a folder once and return (name, is_dir) tuples."""
+        return scan_dir(path)
+
+    def scandir_batches(self, path: str, batch_size: int = 1000) -> Iterator[List[Tuple[str, bool]]]:
+        """Read a folder and yield (name, is_dir) tuples in batches as they are read."""
+        return scan_dir_batches(path, batch_size)
+
+    def scandir_metadata(self, path: str) -> List[MetadataRow]:
+        """Read a folder once, statting each entry."""
+        return scan_dir_metadata(path)
+
+    def stat_key(self, path: str) -> Tuple[int, int, int]:
+        """Get the folder mtime, inode and device."""
+        return get_stat_key(path)
+
+    def can_cache(self, key: Hashable) -> bool:
+        """Reject keys of folders modified within the mtime granularity."""
+        return time.time() - key[0] / 1e9 >= self._RACY_WINDOW  # type: ignore
+
+    def realpath(self, path: str) -> str:
+        """Resolve symlinks and relative components."""
+        return os.path.realpath(path)
+
+    def isdir(self, path: str) -> bool:
+        """Check if a path is a folder, following symlinks."""
+        return os.path.isdir(path)
+
+    def isfile(self, path: str) -> bool:
+        """Check if a path is a file, following symlinks."""
+        return os.path.isfile(path)
+
+
+class MemoryBackend(FileSystemBackend):
+    """A folder tree held in memory, for tests and benchmarks."""
+
+    def __init__(self, root: str = os.sep):
+        self.root = root
+        self._dirs: Dict[str, Dict[str, bool]] = {root: {}}
+        self._versions: Dict[str, int] = {root: 0}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _normalize(self, path: str) -> str:
+        """Normalize a path without touching the local filesystem."""
+        return os.path.normpath(os.path.join(self.root, path))
+
+    def _touch(self, path: str) -> None:
+        """Give a folder a new stat key."""
+        self._version += 1
+        self._versions[path] = self._version
+
+    def add_dir(self, path: str) -> None:
+        """Create a folder and any missing parent folders."""
+        path = self._normalize(path)
+
+        with self._lock:
+            missing = []
+
+            while path not in self._dirs:
+                if os.path.dirname(path) == path:
+                    raise FileNotFoundError(path)
+
+                missing.append(path)
+                path = os.path.dirname(path)
+
+            for folder in reversed(missing):
+                parent, name = os.path.split(folder)
+                self._dirs[parent][name] = True
+                self._touch(parent)
+                self._dirs[folder] = {}
+                self._touch(folder)
+
+    def add_file(self, path: str) -> None:
+        """Create a file, creating missing parent folders."""
+        parent, name = os.path.split(self._normalize(path))
+        self.add_dir(parent)
+
+        with self._lock:
+            self._dirs[parent][name] = False
+            self._touch(parent)
+
+    def remove(self, path: str) -> None:
+        """Remove a file or a folder and everything below it."""
+        path = self._normalize(path)
+        parent, name = os.path.split(path)
+
+        with self._lock:
+            if self._dirs.get(parent, {}).pop(name, None) is None:
+                raise FileNotFoundError(path)
+
+            self._touch(parent)
+
+            for folder in [folder for folder in self._dirs if folder == path or folder.startswith(path + os.sep)]:
+                del self._dirs[folder]
+                del self._versions[folder]
+
+    def scandir(self, path: str) -> List[Tuple[str, bool]]:
+        """List a folder."""
+        with self._lock:
+            return list(self._get_dir(path).items())
+
+    def stat_key(self, path: str) -> int:
+        """Get the folder version, which changes on every modification."""
+        with self._lock:
+            self._get_dir(path)
+            return self._versions[self._normalize(path)]
+
+    def realpath(self, path: str) -> str:
+        """Normalize a path."""
+        return self._normalize(path)
+
+    def isdir(self, path: str) -> bool:
+        """Check if a path is a folder."""
+        return self._normalize(path) in self._dirs
+
+    def isfile(self, path: str) -> bool:
+        """Check if a path is a file."""
+        parent, name = os.path.split(self._normalize(path))
+        return self._dirs.get(parent, {}).get(name) is False
+
+    def _get_dir(self, path: str) -> Dict[str, bool]:
+        """Get the entries of a folder, raising like os.scandir if it is missing."""
+        path = self._normalize(path)
+        folder = self._dirs.get(path)
+
+        if folder is None:
+            parent, name = os.path.split(path)
+
+            if self._dirs.get(parent, {}).get(name) is False:
+                raise NotADirectoryError(path)
+
+            raise FileNotFoundError(path)
+
+        return folder
+
+
+class FsspecBackend(FileSystemBackend):
+    """Adapter for fsspec-style filesystems, e.g. FsspecBackend(fsspec.filesystem('s3'))."""
+
+    def __init__(self, fs: Any):
+        self.fs = fs
+
+    def scandir(self, path: str) -> List[Tuple[str, bool]]:
+        """List a folder with a single detailed ls call."""
+        return [
+            (posixpath.basename(info['name'].rstrip('/')), info['type'] == 'directory')
+            for info in self.fs.ls(path, detail=True)
+        ]
+
+    def scandir_metadata(self, path: str) -> List[MetadataRow]:
+        """List a folder with sizes and modification times from the same ls call."""
+        rows = []
+
+        for info in self.fs.ls(path, detail=True):
+            mtime = info.get('mtime', info.get('LastModified'))
+
+            if hasattr(mtime, 'timestamp'):
+                mtime = mtime.timestamp()
+
+            rows.append((
+                posixpath.basename(info['name'].rstrip('/')),
+                info['type'] == 'directory',
+                info.get('size'),
+                int(mtime * 1e9) if isinstance(mtime, (int, float)) else None
+            ))
+
+        return rows
+
+    def stat_key(self, path: str) -> Tuple[Any, ...]:
+        """Get the folder modification time where the filesystem reports one.
+
+        Filesystems without folder mtimes return a constant key, so their
+        listings stay cached until invalidate_cache() is called.
+        """
+        info = self.fs.info(path)
+        return (info.get('mtime'), info.get('LastModified'), info.get('type'))
+
+    def realpath(self, path: str) -> str:
+        """Normalize a path."""
+        return posixpath.normpath(path)
+
+    def isdir(self, path: str) -> bool:
+        """Check if a path is a folder."""
+        return self.fs.isdir(path)
+
+    def isfile(self, path: str) -> bool:
+        """Check if a path is a file."""
+        return self.fs.isfile(path)
+
+
+class CachedBackend(FileSystemBackend):
+    """Remembers the results of another backend for ttl seconds, to put in front of slow metadata sources."""
+
+    def __init__(self, backend: FileSystemBackend, ttl: float = 60.0, max_items: int = 10000):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_items = max_items
+        self._results: 'OrderedDict[Tuple[str, str], Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, operation: str, path: str, function: Callable[[str], Any]) -> Any:
+        """Call a function of a path, reusing a result that has not expired."""
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._results.get((operation, path))
+
+            if cached is not None and now - cached[0] < self.ttl:
+                self._results.move_to_end((operation, path))
+                return cached[1]
+
+        result = function(path)
+
+        with self._lock:
+            self._results[(operation, path)] = (now, result)
+
+            while len(self._results) > self.max_items:
+                self._results.popitem(last=False)
+
+        return result
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Forget the results for a path, or for all paths if no path is given."""
+        with self._lock:
+            if path is None:
+                self._results.clear()
+            else:
+                for key in [key for key in self._results if key[1] == path]:
+                    del self._results[key]
+
+    def scandir(self, path: str) -> List[Tuple[str, bool]]:
+        """List a folder."""
+        return self.cached('scandir', path, self.backend.scandir)
+
+    def scandir_metadata(self, path: str) -> List[MetadataRow]:
+        """List a folder with sizes and modification times."""
+        return self.cached('scandir_metadata', path, self.backend.scandir_metadata)
+
+    def stat_key(self, path: str) -> Hashable:
+        """Get the folder stat key."""
+        return self.cached('stat_key', path, self.backend.stat_key)
+
+    def can_cache(self, key: Hashable) -> bool:
+        """Check if the wrapped backend trusts a stat key."""
+        return self.backend.can_cache(key)
+
+    def realpath(self, path: str) -> str:
+        """Get the canonical form of a path."""
+        return self.cached('realpath', path, self.backend.realpath)
+
+    def isdir(self, path: str) -> bool:
+        """Check if a path is a folder."""
+        return self.cached('isdir', path, self.backend.isdir)
+
+    def isfile(self, path: str) -> bool:
+        """Check if a path is a file."""
+        return self.cached('isfile', path, self.backend.isfile)
+
+
+# Stateless, so one instance is shared and caches keyed on the backend match across choosers
+_local_backend = LocalBackend()
+
+
+def get_default_backend() -> FileSystemBackend:
+    """Get the local filesystem backend."""
+    return _local_backend
@@ -0,0 +1,520 @@
+"""Directory listing cache."""
+import concurrent.futures
+import errno
+import itertools
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from .backends import FileSystemBackend, get_default_backend
+from .utils import Metadata, PackedEntries
+
+
+def run_in_thread(fn: Callable[..., Any], *args: Any, name: str = 'ipyfilechooser') -> Future:
+    """Run a call on its own daemon thread, as a call hanging on a dead mount must neither hold up others nor exit.
+
+    The call is skipped if the returned future is cancelled before the thread starts it.
+    """
+    future: Future = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+
+    return future
+
+
+class ListingCache:
+    """Bounded LRU cache of folder scans, with optional entry metadata, validated against the backend stat key."""
+
+    # Failed folders remembered at most
+    _MAX_FAILURES = 1024
+
+    def __init__(
+            self,
+            max_dirs: int = 32,
+            max_entries: int = 200000,
+            backend: Optional[FileSystemBackend] = None,
+            failure_ttl: float = 30.0):
+        self.backend = backend if backend is not None else get_default_backend()
+        self.max_dirs = max_dirs
+        self.max_entries = max_entries
+        self.failure_ttl = failure_ttl
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+        self._entries: 'OrderedDict[str, Tuple[Hashable, PackedEntries, Optional[Metadata]]]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.RLock()
+        # Scans in progress, by path and whether they include metadata
+        self._scans: Dict[Tuple[str, bool], Future] = {}
+        # The folder each live owner (e.g. a FileChooser) is showing, with the order it was pinned in
+        self._pins: 'weakref.WeakKeyDictionary[Any, Tuple[int, str]]' = weakref.WeakKeyDictionary()
+        self._pin_order = itertools.count()
+        # Folders that could not be read, with the time they may be tried again and the error
+        self._failures: 'OrderedDict[str, Tuple[float, OSError]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._entries
+
+    def get(self, path: str) -> Optional[PackedEntries]:
+        """Return the cached scan of a folder if it is still current."""
+        cached = self._get(path)
+
+        return cached[0] if cached is not None else None
+
+    def _get(self, path: str) -> Optional[Tuple[PackedEntries, Optional[Metadata]]]:
+        """Return the cached scan and metadata of a folder if it is still current."""
+        with self._lock:
+            cached = self._entries.get(path)
+
+        if cached is None:
+            return None
+
+        try:
+            key = self.backend.stat_key(path)
+        except OSError:
+            key = None
+
+        with self._lock:
+            if key != cached[0]:
+                self._discard(path)
+                return None
+
+            self._entries.move_to_end(path)
+            return cached[1], cached[2]
+
+    def put(
+            self,
+            path: str,
+            key: Hashable,
+            entries: PackedEntries,
+            metadata: Optional[Metadata] = None) -> None:
+        """Store a folder scan taken while the folder had the given stat key."""
+        if self.max_dirs <= 0 or len(entries) > self.max_entries:
+            return
+
+        if not self.backend.can_cache(key):
+            return
+
+        with self._lock:
+            self._discard(path)
+            self._entries[path] = (key, entries, metadata)
+            self._size += len(entries)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used folders over the limits, keeping pinned folders."""
+        pinned = self._pinned()
+
+        for path in list(self._entries):
+            if len(self._entries) <= self.max_dirs and self._size <= self.max_entries:
+                break
+
+            if path not in pinned:
+                self._discard(path)
+
+    def _pinned(self) -> Set[str]:
+        """Get the cached folders kept by pins, the most recently pinned first, within half of each limit.
+
+        Owners that are never unpinned can then not keep the cache from making room for new folders.
+        """
+        pinned: Set[str] = set()
+        size = 0
+
+        for _, path in sorted(self._pins.values(), reverse=True):
+            cached = self._entries.get(path)
+
+            if cached is None or path in pinned:
+                continue
+
+            if len(pinned) >= self.max_dirs // 2 or size + len(cached[1]) > self.max_entries // 2:
+                break
+
+            pinned.add(path)
+            size += len(cached[1])
+
+        return pinned
+
+    def pin(self, owner: Any, path: str) -> None:
+        """Keep the folder an owner shows from being evicted, releasing the folder it showed before."""
+        with self._lock:
+            self._pins[owner] = (next(self._pin_order), path)
+
+    def unpin(self, owner: Any) -> None:
+        """Release the folder pinned by an owner. Owners that are garbage collected are released too."""
+        with self._lock:
+            self._pins.pop(owner, None)
+
+    def failure(self, path: str) -> Optional[OSError]:
+        """Get the error of a folder that failed to be read less than failure_ttl seconds ago."""
+        with self._lock:
+            failed = self._failures.get(path)
+
+            if failed is None:
+                return None
+
+            if failed[0] <= time.monotonic():
+                del self._failures[path]
+                return None
+
+            return failed[1]
+
+    def has_failures(self) -> bool:
+        """Check if any folder is remembered as failed, to skip looking up each folder."""
+        return bool(self._failures)
+
+    def record_failure(self, path: str, error: OSError) -> None:
+        """Remember that a folder could not be read, so it is not tried again for failure_ttl seconds."""
+        with self._lock:
+            self._failures.pop(path, None)
+            self._failures[path] = (time.monotonic() + self.failure_ttl, error)
+
+            while len(self._failures) > self._MAX_FAILURES:
+                self._failures.popitem(last=False)
+
+    def _raise_failure(self, path: str) -> None:
+        """Raise the error of a folder that failed recently, without touching the backend."""
+        error = self.failure(path)
+
+        if error is not None:
+            raise error.with_traceback(None)
+
+    def run(self, path: str, timeout: Optional[float], scan: Callable[[str], Any]) -> Any:
+        """Run a backend call on a folder, giving up after timeout seconds and leaving it running in the background.
+
+        Folders that failed recently raise their error again right away, and timeouts mark the folder as failed.
+        """
+        self._raise_failure(path)
+
+        if timeout is None:
+            return scan(path)
+
+        future = run_in_thread(scan, path, name='ipyfilechooser-scan')
+
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            error = TimeoutError(errno.ETIMEDOUT, f'Timed out after {timeout}s', path)
+            self.record_failure(path, error)
+            raise error from None
+
+    def scan(self, path: str, timeout: Optional[float] = None) -> PackedEntries:
+        """Scan a folder, reusing the cached result when the folder is unchanged.
+
+        Folders that failed recently raise their error again right away. With a timeout, a scan taking
+        longer raises TimeoutError and marks the folder as failed.
+        """
+        return self.run(path, timeout, self._scan_cached)
+
+    def _scan_cached(self, path: str) -> PackedEntries:
+        """Scan a folder, reusing the cached result when the folder is unchanged."""
+        entries = self.get(path)
+
+        if entries is not None:
+            self.hits += 1
+            return entries
+
+        return self._scan_once(path, False, self._scan)[0]
+
+    def scan_metadata(self, path: str, timeout: Optional[float] = None) -> Tuple[PackedEntries, Metadata]:
+        """Scan a folder with entry sizes and mtimes, failing and timing out like scan."""
+        return self.run(path, timeout, self._scan_metadata_cached)
+
+    def _scan_metadata_cached(self, path: str) -> Tuple[PackedEntries, Metadata]:
+        """Scan a folder with entry sizes and mtimes, reusing a cached scan that includes them."""
+        cached = self._get(path)
+
+        if cached is not None and cached[1] is not None:
+            self.hits += 1
+            return cached  # type: ignore
+
+        return self._scan_once(path, True, self._scan_metadata)  # type: ignore
+
+    def _scan_once(
+            self,
+            path: str,
+            with_metadata: bool,
+            scan: Callable[[str], Tuple[PackedEntries, Optional[Metadata]]]
+    ) -> Tuple[PackedEntries, Optional[Metadata]]:
+        """Run a scan, or wait for the same scan already running in another thread."""
+        while True:
+            with self._lock:
+                running = self._scans.get((path, with_metadata))
+
+                # A scan with metadata also answers a plain scan
+                if running is None and not with_metadata:
+                    running = self._scans.get((path, True))
+
+                if running is None:
+                    future: Future = Future()
+                    self._scans[(path, with_metadata)] = future
+                    self.misses += 1
+                    break
+
+                self.deduplicated += 1
+
+            result = running.result()
+
+            # A prefetch that gave up at its entry budget leaves the scan to the threads waiting on it
+            if result is not None:
+                return result
+
+        try:
+            result = scan(path)
+            future.set_result(result)
+
+            # A scan that outlived its timeout clears the failure it caused
+            with self._lock:
+                self._failures.pop(path, None)
+
+            return result
+        except BaseException as e:
+            if isinstance(e, OSError):
+                self.record_failure(path, e)
+
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._scans[(path, with_metadata)]
+
+    def _scan(self, path: str) -> Tuple[PackedEntries, None]:
+        """Scan a folder into the cache."""
+        # Stat before scanning so a change during the scan marks the entry stale
+        key = self.backend.stat_key(path)
+        entries = PackedEntries(self.backend.scandir(path))
+        self.put(path, key, entries)
+
+        return entries, None
+
+    def _scan_metadata(self, path: str) -> Tuple[PackedEntries, Metadata]:
+        """Scan a folder with entry sizes and mtimes into the cache."""
+        # Sizes and mtimes cost a stat per entry, so they are kept with the scan
+        key = self.backend.stat_key(path)
+        rows = self.backend.scandir_metadata(path)
+        entries = PackedEntries((name, is_dir) for name, is_dir, _, _ in rows)
+        metadata = {name: (size, mtime_ns) for name, _, size, mtime_ns in rows}
+        self.put(path, key, entries, metadata)
+
+        return entries, metadata
+
+    def scan_batches(self, path: str, batch_size: int = 1000) -> Iterator[Sequence[Tuple[str, bool]]]:
+        """Scan a folder in batches, caching the result once the scan completes."""
+        self._raise_failure(path)
+        entries = self.get(path)
+
+        if entries is not None:
+            self.hits += 1
+            yield entries
+            return
+
+        self.misses += 1
+        scanned: List[Tuple[str, bool]] = []
+
+        try:
+            key = self.backend.stat_key(path)
+
+            for batch in self.backend.scandir_batches(path, batch_size):
+                scanned.extend(batch)
+                yield batch
+        except OSError as e:
+            self.record_failure(path, e)
+            raise
+
+        self.put(path, key, PackedEntries(scanned))
+
+    def warm(self, path: str, max_entries: Optional[int] = None) -> int:
+        """Scan a folder into the cache unless it is current or being scanned, giving up after max_entries entries.
+
+        Scans of the folder started meanwhile wait for this one, and read the folder themselves if it gives up.
+        """
+        with self._lock:
+            if self.failure(path) is not None or (path, False) in self._scans or (path, True) in self._scans:
+                return 0
+
+            if self.get(path) is not None:
+                return 0
+
+            future: Future = Future()
+            self._scans[(path, False)] = future
+
+        entries: List[Tuple[str, bool]] = []
+        result = None
+
+        try:
+            try:
+                key = self.backend.stat_key(path)
+
+                for batch in self.backend.scandir_batches(path):
+                    entries.extend(batch)
+
+                    if max_entries is not None and len(entries) > max_entries:
+                        break
+                else:
+                    result = (PackedEntries(entries), None)
+                    self.put(path, key, result[0])
+            finally:
+                # Waiting scans that retry must not find this scan again
+                with self._lock:
+                    del self._scans[(path, False)]
+        except BaseException as e:
+            if isinstance(e, OSError):
+                # Prefetching finds unreadable folders before the user clicks them
+                self.record_failure(path, e)
+
+            future.set_exception(e)
+            raise
+
+        future.set_result(result)
+
+        return len(entries)
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop a cached folder and its failure, or all folders and failures if no path is given."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._failures.clear()
+                self._size = 0
+            else:
+                self._discard(path)
+                self._failures.pop(path, None)
+
+    def _discard(self, path: str) -> None:
+        """Remove an entry, keeping the size count in sync."""
+        cached = self._entries.pop(path, None)
+
+        if cached is not None:
+            self._size -= len(cached[1])
+
+
+# Listing caches shared by all choosers using the same backend
+_shared_caches: 'weakref.WeakKeyDictionary[FileSystemBackend, ListingCache]' = weakref.WeakKeyDictionary()
+_shared_caches_lock = threading.Lock()
+
+
+def get_shared_cache(
+        backend: FileSystemBackend,
+        max_dirs: int = 32,
+        max_entries: int = 200000,
+        failure_ttl: float = 30.0) -> ListingCache:
+    """Get the cache shared by all users of a backend, growing its limits to at least the ones given.
+
+    The shortest failure_ttl asked for is used, so no user waits longer than requested to retry a folder.
+    """
+    with _shared_caches_lock:
+        cache = _shared_caches.get(backend)
+
+        if cache is None:
+            cache = _shared_caches[backend] = ListingCache(max_dirs, max_entries, backend, failure_ttl)
+        else:
+            cache.max_dirs = max(cache.max_dirs, max_dirs)
+            cache.max_entries = max(cache.max_entries, max_entries)
+            cache.failure_ttl = min(cache.failure_ttl, failure_ttl)
+
+    return cache
+
+
+class Prefetcher:
+    """Warms a ListingCache in the background for the folders a user is likely to open next."""
+
+    def __init__(self, cache: ListingCache, max_dirs: int = 8, max_workers: int = 2, max_entries: int = 50000):
+        self.cache = cache
+        self.max_dirs = max_dirs
+        self.max_workers = max_workers
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._prefetched: Set[str] = set()
+        # Folders waiting to be warmed, and the number of daemon threads warming them
+        self._queue: Deque[str] = deque()
+        self._workers = 0
+        self._budget = 0
+        # Reentrant, as a chooser closed by garbage collection stops its prefetcher on whichever thread it runs on
+        self._lock = threading.RLock()
+
+    def record_visit(self, path: str) -> None:
+        """Count whether a folder that is about to be listed can be served from the cache."""
+        with self._lock:
+            if path in self.cache:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def prefetch(self, path: str, subdirs: Iterable[str], parent: bool = True) -> None:
+        """Queue the parent folder and the first max_dirs subfolders of path, dropping older queued work."""
+        candidates = [os.path.dirname(path)] if parent and os.path.dirname(path) != path else []
+        candidates.extend(os.path.join(path, name) for name in itertools.islice(subdirs, self.max_dirs))
+
+        with self._lock:
+            self._queue = deque(candidates)
+            self._budget = self.max_entries
+
+            # Daemon threads, as a prefetch hanging on a dead mount must not block interpreter exit
+            while self._workers < min(self.max_workers, len(self._queue)):
+                self._workers += 1
+                threading.Thread(target=self._work, name='ipyfilechooser-prefetch', daemon=True).start()
+
+    def stop(self) -> None:
+        """Drop the queued folders, letting the folders being warmed finish."""
+        with self._lock:
+            self._queue.clear()
+
+    def _work(self) -> None:
+        """Warm queued folders until the queue runs out."""
+        while True:
+            with self._lock:
+                try:
+                    path = self._queue.popleft()
+                except IndexError:
+                    self._workers -= 1
+                    return
+
+            self._warm(path)
+
+    def _warm(self, path: str) -> None:
+        """Load one folder into the cache while the entry budget lasts."""
+        if self._budget <= 0:
+            return
+
+        try:
+            real_path = self.cache.backend.realpath(path)
+
+            if real_path in self.cache:
+                return
+
+            count = self.cache.warm(real_path, self._budget)
+        except OSError:
+            return
+
+        with self._lock:
+            self._budget -= count
+
+            if real_path in self.cache:
+                self._prefetched.add(real_path)
+
+            # Forget prefetched folders that have since been evicted
+            if len(self._prefetched) > 4 * max(self.cache.max_dirs, self.max_dirs):
+                self._prefetched = {prefetched for prefetched in self._prefetched if prefetched in self.cache}
+
+    def stats(self) -> Dict[str, int]:
+        """Get the prefetch hit and miss counts."""
+        return {
+            'prefetched': len(self._prefetched),
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -1,11 +1,23 @@
+import errno
 import os
+import sys
+import threading
+import time
 import warnings
-from typing import Optional, Sequence, Mapping, Callable
-from ipywidgets import Dropdown, Text, Select, Button, HTML
+from array import array
+from concurrent.futures import Future
+from contextlib import contextmanager, ExitStack
+from typing import Any, Optional, Sequence, Mapping, Callable, Dict, Iterator, List, Tuple, Union
+from ipywidgets import Combobox, Dropdown, Text, Select, Button, HTML, Widget
 from ipywidgets import Layout, GridBox, Box, HBox, VBox, ValueWidget
-from .errors import ParentPathError, InvalidFileNameError
-from .utils import get_subpaths, get_dir_contents, match_item, strip_parent_path
-from .utils import is_valid_filename, get_drive_letters, normalize_path, has_parent_path
+from .backends import FileSystemBackend, CachedBackend
+from .cache import Prefetcher, run_in_thread
+from .errors import ParentPathError
+from .model import FileChooserModel
+from .search import compile_query, get_name_index
+from .stats import Stats
+from .utils import DirListing, same_listing
+from .watcher import FolderWatcher, get_default_watcher
 
 
 class FileChooser(VBox, ValueWidget):
@@ -13,6 +25,21 @@ class FileChooser(VBox, ValueWidget):
 
     _LBL_TEMPLATE = '<span style="color:{1};">{0}</span>'
     _LBL_NOFILE = 'No selection'
+    _LOADING_MSG = 'Loading\u2026'
+    _SEARCHING_MSG = 'Searching\u2026'
+    _NO_MATCHES_MSG = 'No matches'
+    _MARK_OFF = '\u2610 '
+    _MARK_ON = '\u2611 '
+    _MARK_FAILED = '\u26A0 '
+    _MARK_FOLDER_DESC = ('Select this folder', 'Unselect this folder')
+    _GRID_AREAS = '''
+        'pathlist {}'
+        'pathinput pathinput'
+        'search search'
+        'dircontent dircontent'
+        'pager pager'
+        'bulk bulk'
+        '''
 
     def __init__(
             self,
@@ -27,33 +54,94 @@ class FileChooser(VBox, ValueWidget):
             dir_icon_append: bool = False,
             show_only_dirs: bool = False,
             filter_pattern: Optional[Sequence[str]] = None,
+            filter_case_sensitive: bool = False,
             sandbox_path: Optional[str] = None,
+            max_options: Optional[int] = None,
+            async_listing: bool = False,
+            listing_timeout: Optional[float] = 30.0,
+            stream_listing: bool = False,
+            stream_batch_size: int = 1000,
+            stream_interval: float = 0.5,
+            cache_size: int = 32,
+            cache_max_entries: int = 200000,
+            prefetch: int = 0,
+            auto_refresh: bool = False,
+            watcher: Optional[FolderWatcher] = None,
+            instrument: bool = False,
+            stats_hook: Optional[Callable[[Mapping[str, Any]], None]] = None,
+            backend: Optional[FileSystemBackend] = None,
+            search: bool = False,
+            search_limit: int = 100,
+            search_fuzzy: bool = False,
+            sort_by: str = 'name',
+            show_details: bool = False,
+            shared_cache: bool = True,
+            lazy: bool = False,
+            multiple: bool = False,
+            path_cache_ttl: float = 10.0,
+            scan_timeout: Optional[float] = None,
+            failure_ttl: float = 30.0,
+            path_input: bool = False,
             layout: Layout = Layout(width='500px'),
             **kwargs):
         """Initialize FileChooser object."""
-        # Check if path and sandbox_path align
-        if sandbox_path and not has_parent_path(normalize_path(path), normalize_path(sandbox_path)):
-            raise ParentPathError(path, sandbox_path)
-
-        # Verify the filename is valid
-        if not is_valid_filename(filename):
-            raise InvalidFileNameError(filename)
-
-        self._default_path = normalize_path(path)
-        self._default_filename = filename
-        self._selected_path: Optional[str] = None
-        self._selected_filename: Optional[str] = None
-        self._show_hidden = show_hidden
+        self._model = FileChooserModel(
+            path=path,
+            filename=filename,
+            show_hidden=show_hidden,
+            dir_icon=dir_icon,
+            dir_icon_append=dir_icon_append,
+            show_only_dirs=show_only_dirs,
+            filter_pattern=filter_pattern,
+            filter_case_sensitive=filter_case_sensitive,
+            sandbox_path=sandbox_path,
+            sort_by=sort_by,
+            show_details=show_details,
+            cache_size=cache_size,
+            cache_max_entries=cache_max_entries,
+            shared_cache=shared_cache,
+            multiple=multiple,
+            path_cache_ttl=path_cache_ttl,
+            scan_timeout=scan_timeout,
+            failure_ttl=failure_ttl,
+            backend=backend,
+            stats=Stats(hook=stats_hook) if instrument or stats_hook is not None else None
+        )
+        self._stats_hook = stats_hook
         self._select_desc = select_desc
         self._change_desc = change_desc
         self._select_default = select_default
-        self._dir_icon = dir_icon
-        self._dir_icon_append = dir_icon_append
-        self._show_only_dirs = show_only_dirs
-        self._filter_pattern = filter_pattern
-        self._sandbox_path = normalize_path(sandbox_path) if sandbox_path is not None else None
         self._callback: Optional[Callable] = None
 
+        self._prefetcher = Prefetcher(self._model.cache, max_dirs=prefetch) if prefetch > 0 else None
+        self._max_options = max_options
+        self._window_start = 0
+        # Listing indices of the entries matching the name filter, and of those sent to the folder view
+        self._window: Sequence[int] = range(0)
+        self._shown: Sequence[int] = range(0)
+        self._async_listing = async_listing or stream_listing
+        self._listing_timeout = listing_timeout
+        self._listing_progress = 0.0
+        self._stream_listing = stream_listing
+        self._stream_batch_size = stream_batch_size
+        self._stream_interval = stream_interval
+        self._state_lock = threading.RLock()
+        self._request_id = 0
+        self._pending_listing: Optional[Future] = None
+        # Which threads are updating the form, so that worker threads do not hide clicks from the kernel thread
+        self._form_holder = threading.local()
+        self._auto_refresh = auto_refresh
+        self._watcher = watcher
+        self._watched_path: Optional[str] = None
+        self._lazy = lazy
+        self._deferred_form: Optional[Tuple[str, str]] = None
+        self._search_limit = search_limit
+        self._search_fuzzy = search_fuzzy
+        self._search_id = 0
+        self._search_map: Dict[str, str] = {}
+        # Folder that relative typed paths start from, fixed when typing starts so that jumps do not move it
+        self._path_input_base: Optional[str] = None
+
         # Widgets
         self._pathlist = Dropdown(
             description="",
@@ -66,10 +154,8 @@ class FileChooser(VBox, ValueWidget):
             placeholder='output filename',
             layout=Layout(
                 width='auto',
-                grid_area='filename',
-                display=(None, "none")[self._show_only_dirs]
-            ),
-            disabled=self._show_only_dirs
+                grid_area='filename'
+            )
         )
         self._dircontent = Select(
             rows=8,
@@ -78,6 +164,99 @@ class FileChooser(VBox, ValueWidget):
                 grid_area='dircontent'
             )
         )
+        self._page_prev = Button(
+            description='\u25C0',
+            tooltip='Previous entries',
+            layout=Layout(min_width='3em', width='3em')
+        )
+        self._page_next = Button(
+            description='\u25B6',
+            tooltip='More entries',
+            layout=Layout(min_width='3em', width='3em')
+        )
+        self._page_label = HTML(
+            value='',
+            layout=Layout(margin='0 1em 0 1em')
+        )
+        self._name_filter = Text(
+            placeholder='filter names',
+            layout=Layout(width='auto', flex='1 1 auto')
+        )
+        self._pager = HBox(
+            children=[
+                self._page_prev,
+                self._page_next,
+                self._page_label,
+                self._name_filter
+            ],
+            layout=Layout(
+                width='auto',
+                grid_area='pager',
+                display='none'
+            )
+        )
+        self._path_input = Combobox(
+            placeholder='type a path to go to',
+            ensure_option=False,
+            layout=Layout(
+                width='auto',
+                grid_area='pathinput',
+                display=(None, 'none')[not path_input]
+            )
+        )
+        self._search = Text(
+            placeholder='search all folders',
+            layout=Layout(
+                width='auto',
+                grid_area='search',
+                display=(None, 'none')[not search]
+            )
+        )
+        self._search_results = Select(
+            rows=8,
+            layout=Layout(
+                width='auto',
+                grid_area='dircontent',
+                display='none'
+            )
+        )
+        self._mark_pattern = Text(
+            placeholder='pattern, e.g. *.csv',
+            layout=Layout(width='auto', flex='1 1 auto')
+        )
+        self._mark_matching = Button(
+            description='Select matching',
+            layout=Layout(min_width='9em', width='9em')
+        )
+        self._mark_all = Button(
+            description='Select all',
+            layout=Layout(min_width='6em', width='6em')
+        )
+        self._unmark_all = Button(
+            description='Clear',
+            layout=Layout(min_width='6em', width='6em')
+        )
+        self._mark_folder = Button(
+            description=self._MARK_FOLDER_DESC[0],
+            layout=Layout(
+                min_width='11em',
+                width='11em',
+                display=(None, 'none')[not (multiple and show_only_dirs)]
+            )
+        )
+        self._bulk = HBox(
+            children=[
+                self._mark_pattern,
+                self._mark_matching,
+                self._mark_all,
+                self._unmark_all,
+                self._mark_folder
+            ],
+            layout=Layout(
+                width='auto',
+                grid_area='bulk'
+            )
+        )
         self._cancel = Button(
             description='Cancel',
             layout=Layout(
@@ -104,8 +283,18 @@ class FileChooser(VBox, ValueWidget):
         self._pathlist.observe(self._on_pathlist_select, names='value')
         self._dircontent.observe(self._on_dircontent_select, names='value')
         self._filename.observe(self._on_filename_change, names='value')
+        self._name_filter.observe(self._on_name_filter_change, names='value')
+        self._path_input.observe(self._on_path_input_change, names='value')
+        self._search.observe(self._on_search_change, names='value')
+        self._search_results.observe(self._on_search_result_select, names='value')
+        self._page_prev.on_click(self._on_page_prev_click)
+        self._page_next.on_click(self._on_page_next_click)
         self._select.on_click(self._on_select_click)
         self._cancel.on_click(self._on_cancel_click)
+        self._mark_matching.on_click(self._on_mark_matching_click)
+        self._mark_all.on_click(self._on_mark_all_click)
+        self._unmark_all.on_click(self._on_unmark_all_click)
+        self._mark_folder.on_click(self._on_mark_folder_click)
 
         # Selected file label
         self._label = HTML(
@@ -120,20 +309,43 @@ class FileChooser(VBox, ValueWidget):
             children=[
                 self._pathlist,
                 self._filename,
-                self._dircontent
+                self._path_input,
+                self._search,
+                self._dircontent,
+                self._search_results,
+                self._pager,
+                self._bulk
             ],
             layout=Layout(
                 display='none',
                 width='auto',
                 grid_gap='0px 0px',
-                grid_template_rows='auto auto',
-                grid_template_columns='60% 40%',
-                grid_template_areas='''
-                    'pathlist {}'
-                    'dircontent dircontent'
-                    '''.format(('filename', 'pathlist')[self._show_only_dirs])
+                grid_template_rows='auto auto auto auto auto auto',
+                grid_template_columns='60% 40%'
             )
         )
+        self._update_mode_layout()
+
+        # Widgets whose updates are batched per navigation
+        self._synced_widgets = [
+            self._pathlist,
+            self._filename,
+            self._dircontent,
+            self._select,
+            self._mark_folder,
+            self._name_filter,
+            self._page_prev,
+            self._page_next,
+            self._page_label,
+            self._pager.layout,
+            self._search,
+            self._search_results,
+            self._search_results.layout,
+            self._dircontent.layout
+        ]
+
+        # Only watch the folder for changes while the dialog is open
+        self._gb.layout.observe(self._on_dialog_display, names='display')
 
         buttonbar = HBox(
             children=[
@@ -145,11 +357,11 @@ class FileChooser(VBox, ValueWidget):
         )
 
         # Call setter to set initial form values
-        self._set_form_values(self._default_path, self._default_filename)
+        self._set_form_values(self._model.default_path, self._model.default_filename)
 
         # Use the defaults as the selected values
         if self._select_default:
-            self._apply_selection()
+            self._apply_default_selection()
 
         # Call VBox super class __init__
         super().__init__(
@@ -165,142 +377,702 @@ class FileChooser(VBox, ValueWidget):
     def _set_form_values(self, path: str, filename: str) -> None:
         """Set the form values."""
         # Check if the path falls inside the configured sandbox path
-        if self._sandbox_path and not has_parent_path(path, self._sandbox_path):
-            raise ParentPathError(path, self._sandbox_path)
+        self._model.check_path(path)
+
+        # Do not wait on a folder that failed or timed out recently
+        if self._fail_fast(path):
+            return
+
+        # Lazy choosers only list folders while the dialog is open
+        if self._lazy and self._gb.layout.display == 'none':
+            self._deferred_form = (path, filename)
+            return
 
-        # Disable triggers to prevent selecting an entry in the Select
+        self._load(path, filename, lambda: (path, filename))
+
+    def _load(self, path: str, filename: str, resolve: Callable[[], Tuple[str, Optional[str]]]) -> None:
+        """Read and show the folder and filename resolve leads to, in the background in async mode.
+
+        path and filename are the expected outcome, shown while a background listing is running.
+        """
+        self._deferred_form = None
+        prefetcher = self._prefetcher
+
+        if prefetcher is not None:
+            resolve_path = resolve
+
+            def resolve() -> Tuple[str, Optional[str]]:
+                # Cache keys are real paths, so the visit is counted once the path is resolved
+                target = resolve_path()
+                prefetcher.record_visit(target[0])
+
+                return target
+
+        if self._async_listing:
+            self._request_listing(path, filename, resolve)
+            return
+
+        # Hold the form to prevent selecting an entry in the Select
         # box from automatically triggering a new event.
-        self._pathlist.unobserve(self._on_pathlist_select, names='value')
-        self._dircontent.unobserve(self._on_dircontent_select, names='value')
-        self._filename.unobserve(self._on_filename_change, names='value')
+        with self._state_lock, self._hold_form():
+            try:
+                # Read the folder once, failing early if it can not be read
+                self._show_listing(*self._model.read(*resolve()))
+            except OSError as e:
+                # Deselect the unreadable folder, mark it in the current view and generate a warning
+                self._dircontent.value = None
 
-        try:
-            # Fail early if the folder can not be read
-            _ = os.listdir(path)
-
-            # In folder only mode zero out the filename
-            if self._show_only_dirs:
-                filename = ''
-
-            # Set form values
-            restricted_path = self._restrict_path(path)
-            subpaths = get_subpaths(restricted_path)
-
-            if os.path.splitdrive(subpaths[-1])[0]:
-                # Add missing Windows drive letters
-                drives = get_drive_letters()
-                subpaths.extend(list(set(drives) - set(subpaths)))
-
-            self._pathlist.options = subpaths
-            self._pathlist.value = restricted_path
-            self._filename.value = filename
-
-            # file/folder real names
-            dircontent_real_names = get_dir_contents(
-                path,
-                show_hidden=self._show_hidden,
-                show_only_dirs=self._show_only_dirs,
-                dir_icon=None,
-                filter_pattern=self._filter_pattern,
-                top_path=self._sandbox_path
-            )
+                if self._model.listing is not None:
+                    self._apply_window()
 
-            # file/folder display names
-            dircontent_display_names = get_dir_contents(
-                path,
-                show_hidden=self._show_hidden,
-                show_only_dirs=self._show_only_dirs,
-                dir_icon=self._dir_icon,
-                dir_icon_append=self._dir_icon_append,
-                filter_pattern=self._filter_pattern,
-                top_path=self._sandbox_path
-            )
+                if isinstance(e, PermissionError):
+                    warnings.warn(f'Permission denied for {path}', RuntimeWarning)
+                else:
+                    warnings.warn(f'Unable to list {path}: {e.strerror or e}', RuntimeWarning)
+
+    def _fail_fast(self, path: str) -> bool:
+        """Warn about a folder that recently failed to list instead of reading it again."""
+        error = self._model.failure(path)
+
+        if error is None:
+            return False
+
+        with self._hold_form():
+            self._set_trait(self._dircontent, 'value', None)
 
-            # Dict to map real names to display names
-            self._map_name_to_disp = {
-                real_name: disp_name
-                for real_name, disp_name in zip(
-                    dircontent_real_names,
-                    dircontent_display_names
+        warnings.warn(f'Unable to list {path}: {error.strerror or error}, retrying after a while', RuntimeWarning)
+
+        return True
+
+    @property
+    def _updating(self) -> bool:
+        """Whether the current thread is updating the form."""
+        return getattr(self._form_holder, 'active', False)
+
+    @contextmanager
+    def _hold_form(self) -> Iterator[None]:
+        """Send each widget's changes as a single update and keep the observe handlers from firing."""
+        if self._updating:
+            yield
+            return
+
+        with self._state_lock:
+            self._form_holder.active = True
+            stack = ExitStack()
+
+            try:
+                for widget in self._synced_widgets:
+                    stack.enter_context(widget.hold_sync())
+
+                yield
+            finally:
+                # Closing the stack sends the held updates
+                try:
+                    with self._model.phase('widget_sync'):
+                        stack.close()
+                finally:
+                    self._form_holder.active = False
+
+    @staticmethod
+    def _set_trait(widget: Widget, name: str, value: Any) -> None:
+        """Set a widget trait, skipping values that did not change."""
+        if isinstance(value, list):
+            value = tuple(value)
+
+        if getattr(widget, name) != value:
+            setattr(widget, name, value)
+
+    def _show_listing(self, path: str, filename: Optional[str], listing: DirListing) -> None:
+        """Make a read folder the current folder and show it."""
+        self._set_listing_values(path, filename, listing)
+        self._set_path_values(path, self._model.filename)
+
+    def _stream_dir(
+            self,
+            request_id: int,
+            resolve: Callable[[], Tuple[str, Optional[str]]]) -> Optional[Tuple[str, Optional[str], DirListing]]:
+        """Read a folder in batches, applying partial listings while the scan is running."""
+        path, filename = resolve()
+        self._model.check_path(path)
+        entries: List[Tuple[str, bool]] = []
+        last_flush = None
+        start = time.perf_counter()
+
+        for batch in self._model.cache.scan_batches(path, self._stream_batch_size):
+            if request_id != self._request_id:
+                # Stop scanning once the user navigated elsewhere
+                return None
+
+            entries.extend(batch)
+            self._listing_progress = time.monotonic()
+
+            # Show the first batch right away, then merge the rest at the flush interval
+            if last_flush is None or self._listing_progress - last_flush >= self._stream_interval:
+                self._apply_partial_listing(request_id, path, self._model.list_dir(path, entries))
+                last_flush = time.monotonic()
+
+        if self._model.stats is not None:
+            self._model.stats.record_listing(path, time.perf_counter() - start, len(entries))
+
+        # Sizes and mtimes are read once the names are all shown
+        if self._model.sort_by != 'name' or self._model.show_details:
+            return path, filename, self._model.list_dir(path)
+
+        return path, filename, self._model.list_dir(path, entries)
+
+    def _apply_partial_listing(self, request_id: int, path: str, listing: DirListing) -> None:
+        """Show the entries read so far while a streaming listing is running."""
+        with self._state_lock:
+            if request_id != self._request_id:
+                return
+
+            with self._hold_form():
+                self._set_listing_values(path, None, listing)
+
+    def _set_path_values(self, path: str, filename: str) -> None:
+        """Set the path dropdown and filename field."""
+        restricted_path, subpaths = self._model.get_subpaths(path)
+        self._set_trait(self._pathlist, 'options', subpaths)
+        self._set_trait(self._pathlist, 'value', restricted_path)
+        self._set_trait(self._filename, 'value', filename)
+
+    def _set_listing_values(self, path: str, filename: Optional[str], listing: DirListing) -> None:
+        """Make a listing current and set the folder view from it, keeping the filename unless one is given."""
+        changed = self._model.listing is None or self._model.listing.path != path
+        self._model.apply(path, filename, listing)
+
+        # Start at the top with no name filter when changing folders
+        if changed:
+            self._set_trait(self._name_filter, 'value', '')
+            self._window_start = 0
+
+            # Warm the cache for the folders likely to be opened next
+            if self._prefetcher is not None:
+                self._prefetcher.prefetch(
+                    path,
+                    (name for name, is_dir in listing.iter_entries() if is_dir and name != os.pardir),
+                    parent=listing.parent
                 )
-            }
 
-            # Dict to map display names to real names
-            self._map_disp_to_name = {
-                disp_name: real_name
-                for real_name, disp_name in self._map_name_to_disp.items()
-            }
+        # Keep the listing for validating filename edits in memory
+        self._model.cache.pin(self, path)
+
+        # Set _dircontent form value to (a window of) the display names
+        self._set_trait(self._dircontent, 'disabled', False)
+        self._window = self._filter_window(self._name_filter.value)
+        self._apply_window()
+        self._update_selection_state(self._model.filename)
+        self._update_watch()
+
+    def _on_folder_changed(self, path: str) -> None:
+        """Show the watched folder again if its entries changed."""
+        # List outside of the lock so a slow folder does not block navigation
+        try:
+            listing = self._model.list_dir(path)
+        except OSError:
+            return
+
+        with self._state_lock:
+            if self._model.listing is None or self._model.listing.path != path or self._pending_listing is not None:
+                return
+
+            # Comparing the packed scans is cheap, so unchanged folders cost no per-entry work
+            if same_listing(self._model.listing, listing):
+                return
+
+            # The listing is replaced as a whole, but only the visible window is resent, and only if it changed
+            with self._hold_form():
+                self._model.apply(path, None, listing)
+                self._window = self._filter_window(self._name_filter.value)
+                self._apply_window()
+                self._update_selection_state(self._filename.value)
+
+    def _update_watch(self) -> None:
+        """Watch the listed folder while the dialog is open and auto refresh is enabled."""
+        path = None
+
+        if self._auto_refresh and self._model.listing is not None and self._gb.layout.display is None:
+            path = self._model.listing.path
+
+        if path == self._watched_path:
+            return
 
-            # Set _dircontent form value to display names
-            self._dircontent.options = dircontent_display_names
+        if self._watcher is None:
+            self._watcher = get_default_watcher(self._model.backend)
 
-            # If the value in the filename Text box equals a value in the
-            # Select box and the entry is a file then select the entry.
-            if ((filename in dircontent_real_names) and os.path.isfile(os.path.join(path, filename))):
-                self._dircontent.value = self._map_name_to_disp[filename]
+        if path is None:
+            self._watcher.stop()
+        else:
+            try:
+                self._watcher.watch(path, self._on_folder_changed)
+            except OSError:
+                path = None
+
+        self._watched_path = path
+
+    def _on_dialog_display(self, _change: Mapping[str, Optional[str]]) -> None:
+        """Start or stop watching when the dialog is shown or hidden."""
+        self._update_watch()
+
+    def _request_listing(self, path: str, filename: str, resolve: Callable[[], Tuple[str, Optional[str]]]) -> None:
+        """Resolve and read a folder in the background and apply the result when it arrives."""
+        with self._state_lock:
+            # Newer requests make pending ones stale
+            self._request_id += 1
+            request_id = self._request_id
+
+            if self._pending_listing is not None:
+                self._pending_listing.cancel()
+
+            with self._hold_form():
+                self._set_path_values(path, filename)
+                self._model.listing = None
+                self._set_status_message(self._LOADING_MSG)
+
+            self._listing_progress = time.monotonic()
+
+            # Each request gets its own thread, so folders hanging on a dead mount do not hold up others
+            if self._stream_listing:
+                future = run_in_thread(self._stream_dir, request_id, resolve, name='ipyfilechooser-listing')
             else:
-                self._dircontent.value = None
+                future = run_in_thread(lambda: self._model.read(*resolve()), name='ipyfilechooser-listing')
 
-            # Update the state of the select button
-            if self._gb.layout.display is None:
-                # Disable the select button if path and filename
-                # - equal an existing folder in the current view
-                # - contains an invalid character sequence
-                # - equal the already selected values
-                # - don't match the provided filter pattern(s)
-                check1 = filename in dircontent_real_names
-                check2 = os.path.isdir(os.path.join(path, filename))
-                check3 = not is_valid_filename(filename)
-                check4 = False
-                check5 = False
-
-                # Only check selected if selected is set
-                if ((self._selected_path is not None) and (self._selected_filename is not None)):
-                    selected = os.path.join(self._selected_path, self._selected_filename)
-                    check4 = os.path.join(path, filename) == selected
-
-                # Ensure only allowed extensions are used
-                if self._filter_pattern:
-                    check5 = not match_item(filename, self._filter_pattern)
-
-                if (check1 and check2) or check3 or check4 or check5:
-                    self._select.disabled = True
-                else:
-                    self._select.disabled = False
-        except PermissionError:
-            # Deselect the unreadable folder and generate a warning
-            self._dircontent.value = None
-            warnings.warn(f'Permission denied for {path}', RuntimeWarning)
+            self._pending_listing = future
 
-        # Reenable triggers
-        self._pathlist.observe(self._on_pathlist_select, names='value')
-        self._dircontent.observe(self._on_dircontent_select, names='value')
-        self._filename.observe(self._on_filename_change, names='value')
+        if self._listing_timeout:
+            timer = threading.Timer(self._listing_timeout, self._on_listing_timeout, (request_id, path))
+            timer.daemon = True
+            timer.start()
+            future.add_done_callback(lambda _f: timer.cancel())
+
+        future.add_done_callback(lambda f: self._on_listing_done(request_id, path, f))
+
+    def _on_listing_done(self, request_id: int, path: str, future: Future) -> None:
+        """Apply a background listing unless a newer request replaced it."""
+        with self._state_lock:
+            if request_id != self._request_id or future.cancelled():
+                return
+
+            self._pending_listing = None
+
+            with self._hold_form():
+                try:
+                    self._show_listing(*future.result())
+                except ParentPathError as e:
+                    self._set_status_message(str(e))
+                except PermissionError:
+                    self._set_status_message(f'Permission denied for {path}')
+                    warnings.warn(f'Permission denied for {path}', RuntimeWarning)
+                except OSError as e:
+                    self._set_status_message(f'Unable to list {path}: {e.strerror or e}')
+
+    def _on_listing_timeout(self, request_id: int, path: str) -> None:
+        """Put the chooser into an error state when a background listing hangs."""
+        with self._state_lock:
+            if request_id != self._request_id or self._pending_listing is None:
+                return
+
+            # Streaming listings only time out when no new entries arrive
+            idle = time.monotonic() - self._listing_progress
+
+            if idle < self._listing_timeout:
+                timer = threading.Timer(self._listing_timeout - idle, self._on_listing_timeout, (request_id, path))
+                timer.daemon = True
+                timer.start()
+                return
+
+            # Discard the result if it ever arrives, and do not wait on the folder again for a while
+            pending = self._pending_listing
+            self._request_id += 1
+            self._pending_listing = None
+
+            # Only a read that started can be hanging on the folder, one that never ran is just dropped
+            if not pending.cancel() and pending.running():
+                self._model.cache.record_failure(path, TimeoutError(errno.ETIMEDOUT, 'Timed out', path))
+            with self._hold_form():
+                self._set_status_message(f'Timed out listing {path}')
+
+    def _set_status_message(self, message: str) -> None:
+        """Replace the folder view with a status message and block selections."""
+        self._shown = range(0)
+        self._set_trait(self._dircontent, 'options', [message])
+        self._set_trait(self._dircontent, 'value', None)
+        self._set_trait(self._dircontent, 'disabled', True)
+        self._set_trait(self._pager.layout, 'display', 'none')
+
+        if self._gb.layout.display is None:
+            self._set_trait(self._select, 'disabled', True)
+
+    def _on_path_input_change(self, change: Mapping[str, str]) -> None:
+        """Go to a typed path once it is complete and suggest completions for it from the listing cache."""
+        if self._updating:
+            return
+
+        text = change['new']
+
+        if not text:
+            self._path_input_base = None
+        elif not change['old'] or self._path_input_base is None:
+            self._path_input_base = self._model.path
+
+        base = self._path_input_base
+
+        # A typed separator, a picked suggestion or a pasted path completes the path
+        complete = (
+            text.endswith(tuple(sep for sep in (os.sep, os.altsep) if sep))
+            or text in self._path_input.options
+            or len(text) > len(change['old']) + 1
+        )
+        target = self._model.resolve(text, base) if complete else None
+
+        if target is not None:
+            folder, filename = target
+            self._set_form_values(folder, filename or self._filename.value)
+
+        self._set_trait(self._path_input, 'options', self._model.complete(text, base=base) if text else ())
+
+    def _on_search_change(self, change: Mapping[str, str]) -> None:
+        """Start searching the tree for the new query, superseding the previous search."""
+        if self._updating:
+            return
+
+        query = change['new'].strip()
+
+        with self._state_lock:
+            self._search_id += 1
+            search_id = self._search_id
+
+            with self._hold_form():
+                self._show_search_results([] if query else None, self._SEARCHING_MSG)
+
+        if query:
+            threading.Thread(
+                target=self._run_search,
+                args=(search_id, self._model.sandbox_path or self._form_path(), query),
+                name='ipyfilechooser-search',
+                daemon=True
+            ).start()
+
+    def _run_search(self, search_id: int, root: str, query: str) -> None:
+        """Collect matches from the shared name index, publishing them as they are found."""
+        match = compile_query(query, self._search_fuzzy)
+        is_substring = compile_query(query)
+        # Substring matches, then fuzzy only matches
+        results: Tuple[List[Tuple[str, bool]], List[Tuple[str, bool]]] = ([], [])
+        last_flush = time.monotonic()
+        index = get_name_index(root, self._model.backend)
+
+        for batch in index.search(match, root, lambda: search_id != self._search_id):
+            for path, is_dir, hidden in batch:
+                name = os.path.basename(path)
+
+                if hidden and not self._model.show_hidden:
+                    continue
+                if not is_dir and (self._model.show_only_dirs or self._model.filter_matcher is not None
+                                   and not self._model.filter_matcher(name)):
+                    continue
+
+                ranked = results[0 if is_substring(name) else 1]
+
+                if len(ranked) < self._search_limit:
+                    ranked.append((path, is_dir))
+
+            if len(results[0]) >= self._search_limit:
+                break
+
+            if time.monotonic() - last_flush >= self._stream_interval:
+                self._publish_search_results(search_id, root, results[0] + results[1], False)
+                last_flush = time.monotonic()
+
+        self._publish_search_results(search_id, root, results[0] + results[1], True)
+
+    def _publish_search_results(self, search_id: int, root: str, results: List[Tuple[str, bool]], done: bool) -> None:
+        """Show search results unless a newer search replaced this one."""
+        with self._state_lock:
+            if search_id != self._search_id:
+                return
+
+            self._search_map = {
+                os.path.relpath(path, root) + (os.sep if is_dir else ''): path
+                for path, is_dir in results[:self._search_limit]
+            }
+
+            with self._hold_form():
+                self._show_search_results(list(self._search_map), self._NO_MATCHES_MSG if done else self._SEARCHING_MSG)
+
+    def _show_search_results(self, options: Optional[List[str]], empty_message: str) -> None:
+        """Show search results in place of the folder view, or the folder view again if options is None."""
+        if options is None:
+            self._search_map = {}
+            self._set_trait(self._search_results.layout, 'display', 'none')
+            self._set_trait(self._dircontent.layout, 'display', None)
+            return
+
+        self._set_trait(self._search_results, 'options', options or [empty_message])
+        self._set_trait(self._search_results, 'value', None)
+        self._set_trait(self._search_results, 'disabled', not options)
+        self._set_trait(self._dircontent.layout, 'display', 'none')
+        self._set_trait(self._search_results.layout, 'display', None)
+
+    def _on_search_result_select(self, change: Mapping[str, str]) -> None:
+        """Jump to the folder of a selected search result."""
+        if self._updating:
+            return
+
+        path = self._search_map.get(change['new'])
+
+        if path is None:
+            return
+
+        is_dir = self._model.backend.isdir(path)
+
+        if is_dir:
+            folder, filename = path, self._filename.value
+        else:
+            folder, filename = os.path.split(path)
+
+        # Results found through symlinked folders can lead outside the sandbox path
+        folder = self._model.path_cache.realpath(folder)
+
+        if not self._model.in_sandbox(folder):
+            warnings.warn(f'{path} leads outside the sandbox path', RuntimeWarning)
+            return
+
+        if not is_dir and self._model.multiple:
+            self._model.mark(os.path.join(folder, filename))
+
+        # Clearing the query switches back to the folder view
+        self._search.value = ''
+
+        if self._model.backend.isdir(folder):
+            self._set_form_values(folder, filename)
+
+    def _update_selection_state(self, filename: str) -> None:
+        """Highlight a matching file entry and update the select button using the current listing."""
+        listing = self._model.listing
+        self._model.filename = filename
+
+        # If the value in the filename Text box equals a value in the
+        # Select box and the entry is a file then select the entry.
+        option = self._option_index(listing.index(filename)) if not self._model.multiple else -1
+
+        if option >= 0 and not listing.entry(self._shown[option])[1]:
+            self._set_trait(self._dircontent, 'value', self._dircontent.options[option])
+        else:
+            self._set_trait(self._dircontent, 'value', None)
+
+        # Clicking a folder opens it, so in folder only mode the shown folder is checked with a button
+        if self._model.multiple and self._model.show_only_dirs:
+            marked = self._model.is_marked(listing.path)
+            self._set_trait(self._mark_folder, 'description', self._MARK_FOLDER_DESC[marked])
+
+        # Update the state of the select button
+        if self._gb.layout.display is None:
+            self._set_trait(self._select, 'disabled', not self._model.can_select(listing.path, filename, listing))
+
+    def _windowed(self) -> bool:
+        """Check if the number of entries sent to the folder view is capped."""
+        return self._max_options is not None and self._max_options > 0
+
+    def _option_index(self, index: int) -> int:
+        """Get the position of a listing index among the options sent to the folder view, or -1."""
+        if index < 0:
+            return -1
+
+        # Without a name filter the options are a contiguous range of the listing
+        if isinstance(self._shown, range):
+            return index - self._shown.start if index in self._shown else -1
+
+        try:
+            return self._shown.index(index)
+        except ValueError:
+            return -1
+
+    def _apply_window(self) -> None:
+        """Send the current window of display names to the Select widget."""
+        total = len(self._window)
+
+        if not self._windowed():
+            self._shown = self._window
+            self._set_trait(self._dircontent, 'options', self._options(self._shown))
+            self._set_trait(self._pager.layout, 'display', 'none')
+            return
+
+        # Keep the window start on a page boundary inside the list
+        self._window_start = max(0, min(self._window_start, total - 1))
+        self._window_start -= self._window_start % self._max_options
+        end = min(self._window_start + self._max_options, total)
+
+        self._shown = self._window[self._window_start:end]
+        self._set_trait(self._dircontent, 'options', self._options(self._shown))
+        self._set_trait(self._page_prev, 'disabled', self._window_start == 0)
+        self._set_trait(self._page_next, 'disabled', end >= total)
+        self._set_trait(self._page_label, 'value', f'{self._window_start + 1 if total else 0}\u2013{end} of {total}')
+
+        if total > self._max_options or self._name_filter.value:
+            self._set_trait(self._pager.layout, 'display', None)
+        else:
+            self._set_trait(self._pager.layout, 'display', 'none')
+
+    def _options(self, indices: Sequence[int]) -> List[str]:
+        """Get the display names of listing entries as options.
+
+        Markable entries are prefixed with their mark in multiple mode and folders that failed to list with a warning.
+        """
+        listing = self._model.listing
+
+        if listing is None:
+            return []
+
+        mark_failures = self._model.cache.has_failures()
+
+        if not (self._model.multiple or mark_failures):
+            # The whole listing is derived in one pass over the packed names
+            if len(indices) == len(listing) and isinstance(indices, range):
+                return listing.display_names
+
+            return [listing.display_name(index) for index in indices]
+
+        options = []
+
+        for index in indices:
+            name, is_dir = listing.entry(index)
+            option = listing.display_name(index)
+
+            if mark_failures and is_dir and self._model.failure(os.path.join(listing.path, name)) is not None:
+                option = self._MARK_FAILED + option
+
+            if self._model.multiple and self._model.is_selectable(name, is_dir):
+                marked = self._model.is_marked(os.path.join(listing.path, name))
+                option = (self._MARK_OFF, self._MARK_ON)[marked] + option
+
+            options.append(option)
+
+        return options
+
+    def _on_mark_matching_click(self, _b) -> None:
+        """Mark the entries of the current folder matching the pattern."""
+        pattern = self._mark_pattern.value.strip()
+
+        if pattern:
+            self._model.mark_all(pattern)
+            self._move_window(self._window_start)
+
+    def _on_mark_all_click(self, _b) -> None:
+        """Mark every entry of the current folder."""
+        self._model.mark_all()
+        self._move_window(self._window_start)
+
+    def _on_unmark_all_click(self, _b) -> None:
+        """Unmark every entry, in all folders."""
+        self._model.unmark_all()
+        self._move_window(self._window_start)
+
+    def _on_mark_folder_click(self, _b) -> None:
+        """Mark or unmark the folder being shown."""
+        if self._model.listing is not None:
+            self._model.toggle(self._model.listing.path)
+            self._move_window(self._window_start)
+
+    def _move_window(self, start: int) -> None:
+        """Move the window to a new start position and restore the highlighted entry."""
+        with self._state_lock:
+            if self._model.listing is None:
+                return
+
+            self._window_start = start
+
+            with self._hold_form():
+                self._apply_window()
+                self._update_selection_state(self._filename.value)
+
+    def _on_page_prev_click(self, _b) -> None:
+        """Handle previous page clicks."""
+        self._move_window(self._window_start - (self._max_options or 0))
+
+    def _on_page_next_click(self, _b) -> None:
+        """Handle next page clicks."""
+        self._move_window(self._window_start + (self._max_options or 0))
+
+    def _on_name_filter_change(self, change: Mapping[str, str]) -> None:
+        """Narrow the window to names containing the filter text."""
+        if self._updating or self._model.listing is None:
+            return
+
+        self._window = self._filter_window(change['new'])
+        self._move_window(0)
+
+    def _filter_window(self, text: str) -> Sequence[int]:
+        """Get the listing indices of entries containing text."""
+        if self._model.listing is None:
+            return range(0)
+
+        if not text:
+            return range(len(self._model.listing))
+
+        text = text.lower()
+
+        return array('I', (
+            index
+            for index, (name, _) in enumerate(self._model.listing.iter_entries())
+            if text in name.lower()
+        ))
 
     def _on_pathlist_select(self, change: Mapping[str, str]) -> None:
         """Handle selecting a path entry."""
-        self._set_form_values(self._expand_path(change['new']), self._filename.value)
+        if self._updating:
+            return
+
+        self._set_form_values(self._model.expand_path(change['new']), self._filename.value)
 
     def _on_dircontent_select(self, change: Mapping[str, str]) -> None:
         """Handle selecting a folder entry."""
-        new_path = os.path.realpath(os.path.join(
-            self._expand_path(self._pathlist.value),
-            self._map_disp_to_name[change['new']]
-        ))
+        if self._updating:
+            return
 
-        # Check if folder or file
-        if os.path.isdir(new_path):
-            path = new_path
-            filename = self._filename.value
-        else:
-            path = self._expand_path(self._pathlist.value)
-            filename = self._map_disp_to_name[change['new']]
+        listing = self._model.listing
 
-        self._set_form_values(path, filename)
+        # The Select widget updates its index before the value observers run
+        if listing is None or self._dircontent.index is None or self._dircontent.index >= len(self._shown):
+            return
+
+        # Options carry marks in multiple mode and for failed folders, so names come from the listing
+        name, is_dir = listing.entry(self._shown[self._dircontent.index])
+
+        # Resolving a path on a dead mount can hang as well
+        if self._fail_fast(os.path.join(listing.path, name)):
+            return
+
+        # In multiple mode clicking a file toggles its mark, folders are still opened
+        if self._model.multiple and not is_dir and self._model.is_selectable(name, is_dir):
+            self._model.toggle(os.path.join(listing.path, name))
+            self._move_window(self._window_start)
+            return
+
+        # The model resolves folders to their real path, in the background in async mode
+        if is_dir:
+            self._load(os.path.join(listing.path, name), self._filename.value,
+                       lambda: self._model.resolve_entry(name, True))
+        else:
+            self._load(listing.path, name, lambda: self._model.resolve_entry(name, False))
 
     def _on_filename_change(self, change: Mapping[str, str]) -> None:
         """Handle filename field changes."""
-        self._set_form_values(self._expand_path(self._pathlist.value), change['new'])
+        if self._updating:
+            return
+
+        with self._state_lock:
+            if self._pending_listing is not None or (self._async_listing and self._model.listing is None):
+                # The filename is validated once a background listing arrives
+                return
+
+            if self._model.listing is None:
+                self._set_form_values(self._model.expand_path(self._pathlist.value), change['new'])
+                return
+
+            # Only validate against the in-memory listing, the folder itself is unchanged
+            with self._hold_form():
+                self._update_selection_state(change['new'])
 
     def _on_select_click(self, _b) -> None:
         """Handle select button clicks."""
@@ -325,32 +1097,43 @@ class FileChooser(VBox, ValueWidget):
         self._gb.layout.display = None
         self._cancel.layout.display = None
 
+        # Start from the applied marks, discarding those of a cancelled dialog
+        if self._model.multiple:
+            self._model.restore_marks()
+
         # Show the form with the correct path and filename
-        if ((self._selected_path is not None) and (self._selected_filename is not None)):
-            path = self._selected_path
-            filename = self._selected_filename
+        if ((self._model.selected_path is not None) and (self._model.selected_filename is not None)):
+            path = self._model.selected_path
+            filename = self._model.selected_filename
         else:
-            path = self._default_path
-            filename = self._default_filename
+            path = self._model.default_path
+            filename = self._model.default_filename
 
         self._set_form_values(path, filename)
 
     def _apply_selection(self) -> None:
         """Close the dialog and apply the selection."""
-        self._selected_path = self._expand_path(self._pathlist.value)
-        self._selected_filename = self._filename.value
+        selected = self._model.select(self._form_path(), self._form_filename())
 
-        if ((self._selected_path is not None) and (self._selected_filename is not None)):
-            selected = os.path.join(self._selected_path, self._selected_filename)
+        if selected is not None:
             self._gb.layout.display = 'none'
             self._cancel.layout.display = 'none'
             self._select.description = self._change_desc
             self._select.disabled = False
 
-            if os.path.isfile(selected):
-                self._label.value = self._LBL_TEMPLATE.format(self._restrict_path(selected), 'orange')
+            if isinstance(selected, list):
+                self._label.value = self._LBL_TEMPLATE.format(f'{len(selected)} selected', 'green')
+            elif self._model.backend.isfile(selected):
+                self._label.value = self._LBL_TEMPLATE.format(self._model.restrict_path(selected), 'orange')
             else:
-                self._label.value = self._LBL_TEMPLATE.format(self._restrict_path(selected), 'green')
+                self._label.value = self._LBL_TEMPLATE.format(self._model.restrict_path(selected), 'green')
+
+    def _apply_default_selection(self) -> None:
+        """Use the defaults as the selected values, marking the default file in multiple mode."""
+        if self._model.multiple and self._model.default_filename:
+            self._model.mark(self._model.default)
+
+        self._apply_selection()
 
     def _on_cancel_click(self, _b) -> None:
         """Handle cancel button clicks."""
@@ -358,41 +1141,26 @@ class FileChooser(VBox, ValueWidget):
         self._cancel.layout.display = 'none'
         self._select.disabled = False
 
-    def _expand_path(self, path) -> str:
-        """Calculate the full path using the sandbox path."""
-        if self._sandbox_path:
-            path = os.path.join(self._sandbox_path, path.lstrip(os.sep))
-
-        return path
-
-    def _restrict_path(self, path) -> str:
-        """Calculate the sandboxed path using the sandbox path."""
-        if self._sandbox_path == os.sep:
-            pass
-        elif self._sandbox_path == path:
-            path = os.sep
-        elif self._sandbox_path:
-            if os.path.splitdrive(self._sandbox_path)[0] and len(self._sandbox_path) == 3:
-                # If the value is 'c:\\', strip 'c:' so we retain the leading os.sep char
-                path = strip_parent_path(path, os.path.splitdrive(self._sandbox_path)[0])
-            else:
-                path = strip_parent_path(path, self._sandbox_path)
+    def _form_path(self) -> str:
+        """Get the folder shown in the form, or the folder a lazy chooser will show when opened."""
+        if self._deferred_form is not None:
+            return self._deferred_form[0]
 
-        return path
+        return self._model.expand_path(self._pathlist.value)
 
-    def reset(self, path: Optional[str] = None, filename: Optional[str] = None) -> None:
-        """Reset the form to the default path and filename."""
-        # Check if path and sandbox_path align
-        if path is not None and self._sandbox_path and not has_parent_path(normalize_path(path), self._sandbox_path):
-            raise ParentPathError(path, self._sandbox_path)
+    def _form_filename(self) -> str:
+        """Get the filename in the form, or the filename a lazy chooser will show when opened."""
+        if self._deferred_form is not None:
+            return self._deferred_form[1]
 
-        # Verify the filename is valid
-        if filename is not None and not is_valid_filename(filename):
-            raise InvalidFileNameError(filename)
+        return self._filename.value
 
-        # Remove selection
-        self._selected_path = None
-        self._selected_filename = None
+    def reset(self, path: Optional[str] = None, filename: Optional[str] = None) -> None:
+        """Reset the form to the default path and filename."""
+        # Validate the new defaults and remove the selection
+        self._model.reset(path, filename)
+        self._search.value = ''
+        self._path_input.value = ''
 
         # Hide dialog and cancel button
         self._gb.layout.display = 'none'
@@ -403,54 +1171,231 @@ class FileChooser(VBox, ValueWidget):
         self._select.disabled = False
         self._label.value = self._LBL_TEMPLATE.format(self._LBL_NOFILE, 'black')
 
-        if path is not None:
-            self._default_path = normalize_path(path)
-
-        if filename is not None:
-            self._default_filename = filename
-
-        self._set_form_values(self._default_path, self._default_filename)
+        self._set_form_values(self._model.default_path, self._model.default_filename)
 
         # Use the defaults as the selected values
         if self._select_default:
-            self._apply_selection()
+            self._apply_default_selection()
 
     def refresh(self) -> None:
         """Re-render the form."""
-        self._set_form_values(self._expand_path(self._pathlist.value), self._filename.value)
+        self._set_form_values(self._form_path(), self._form_filename())
+
+    def close(self) -> None:
+        """Close the chooser and its widgets, releasing its cached folder and stopping its background work."""
+        if sys.is_finalizing():
+            # Closed by garbage collection at interpreter exit, where frozen daemon threads may hold the locks below
+            super().close()
+            return
+
+        with self._state_lock:
+            # Results of pending listings and searches are discarded
+            self._request_id += 1
+            self._search_id += 1
+
+            if self._pending_listing is not None:
+                self._pending_listing.cancel()
+                self._pending_listing = None
+
+        if self._watcher is not None and self._watched_path is not None:
+            self._watcher.stop()
+            self._watched_path = None
+
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+
+        # ipywidgets keeps every open widget alive, so the pin is not released by garbage collection
+        self._model.cache.unpin(self)
+
+        widgets = list(self.children)
+
+        while widgets:
+            widget = widgets.pop()
+            widgets.extend(getattr(widget, 'children', ()))
+            widget.close()
+
+        super().close()
+
+    def _redisplay(self) -> None:
+        """Re-filter and re-decorate the shown folder in memory after a display option changed."""
+        with self._state_lock:
+            listing = None
+
+            if self._pending_listing is None and self._deferred_form is None:
+                listing = self._model.relist()
+
+            if listing is not None:
+                with self._hold_form():
+                    self._set_listing_values(listing.path, self._filename.value, listing)
+                return
+
+        # Nothing listed yet, or sizes and mtimes are needed
+        self.refresh()
+
+    @property
+    def prefetch_stats(self) -> Optional[Mapping[str, int]]:
+        """Get the prefetch hit and miss counts, or None if prefetching is disabled."""
+        return self._prefetcher.stats() if self._prefetcher is not None else None
+
+    @property
+    def stats(self) -> Optional[Dict[str, Any]]:
+        """Get the collected timings and counters, or None if instrumentation is disabled."""
+        if self._model.stats is None:
+            return None
+
+        stats = self._model.stats.as_dict()
+        stats['cache'] = {
+            'hits': self._model.cache.hits,
+            'misses': self._model.cache.misses,
+            'deduplicated': self._model.cache.deduplicated,
+            'folders': len(self._model.cache)
+        }
+
+        if self._prefetcher is not None:
+            stats['prefetch'] = self._prefetcher.stats()
+
+        return stats
+
+    @property
+    def instrument(self) -> bool:
+        """Get instrument property value."""
+        return self._model.stats is not None
+
+    @instrument.setter
+    def instrument(self, instrument: bool) -> None:
+        """Enable or disable instrumentation, dropping collected values when disabled."""
+        if not instrument:
+            self._model.stats = None
+        elif self._model.stats is None:
+            self._model.stats = Stats(hook=self._stats_hook)
+
+    def reset_stats(self) -> None:
+        """Drop the collected timings and counters."""
+        if self._model.stats is not None:
+            self._model.stats.reset()
+
+    def invalidate_cache(self, path: Optional[str] = None) -> None:
+        """Drop a cached folder listing, or all cached listings if no path is given, and all resolved paths."""
+        real_path = self._model.backend.realpath(path) if path is not None else None
+
+        if isinstance(self._model.backend, CachedBackend):
+            self._model.backend.invalidate(real_path)
+
+        # Symlinks below the folder may have changed too
+        self._model.path_cache.invalidate()
+
+        self._model.cache.invalidate(real_path)
+
+    @property
+    def backend(self) -> FileSystemBackend:
+        """Get the filesystem backend."""
+        return self._model.backend
 
     @property
     def show_hidden(self) -> bool:
         """Get _show_hidden value."""
-        return self._show_hidden
+        return self._model.show_hidden
 
     @show_hidden.setter
     def show_hidden(self, hidden: bool) -> None:
         """Set _show_hidden value."""
-        self._show_hidden = hidden
-        self.refresh()
+        self._model.show_hidden = hidden
+        self._redisplay()
+
+    @property
+    def sort_by(self) -> str:
+        """Get sort_by property value."""
+        return self._model.sort_by
+
+    @sort_by.setter
+    def sort_by(self, sort_by: str) -> None:
+        """Sort by 'name', 'mtime' (newest first) or 'size' (largest first)."""
+        self._model.sort_by = sort_by
+        self._redisplay()
+
+    @property
+    def show_details(self) -> bool:
+        """Get show_details property value."""
+        return self._model.show_details
+
+    @show_details.setter
+    def show_details(self, show_details: bool) -> None:
+        """Set show_details property value."""
+        self._model.show_details = show_details
+        self._redisplay()
 
     @property
     def dir_icon(self) -> Optional[str]:
         """Get dir icon value."""
-        return self._dir_icon
+        return self._model.dir_icon
 
     @dir_icon.setter
     def dir_icon(self, dir_icon: Optional[str]) -> None:
         """Set dir icon value."""
-        self._dir_icon = dir_icon
-        self.refresh()
+        self._model.dir_icon = dir_icon
+        self._redisplay()
 
     @property
     def dir_icon_append(self) -> bool:
         """Get dir icon value."""
-        return self._dir_icon_append
+        return self._model.dir_icon_append
 
     @dir_icon_append.setter
     def dir_icon_append(self, dir_icon_append: bool) -> None:
         """Prepend or append the dir icon."""
-        self._dir_icon_append = dir_icon_append
-        self.refresh()
+        self._model.dir_icon_append = dir_icon_append
+        self._redisplay()
+
+    @property
+    def max_options(self) -> Optional[int]:
+        """Get the maximum number of entries sent to the folder view."""
+        return self._max_options
+
+    @max_options.setter
+    def max_options(self, max_options: Optional[int]) -> None:
+        """Set the maximum number of entries sent to the folder view."""
+        self._max_options = max_options
+
+        # Drop the name filter, it is only available in windowed mode
+        with self._hold_form():
+            self._name_filter.value = ''
+
+            self._window = self._filter_window('')
+
+            self._move_window(0)
+
+    @property
+    def search(self) -> bool:
+        """Get search property value."""
+        return self._search.layout.display is None
+
+    @search.setter
+    def search(self, search: bool) -> None:
+        """Show or hide the search box."""
+        self._search.value = ''
+        self._search.layout.display = (None, 'none')[not search]
+
+    @property
+    def path_input(self) -> bool:
+        """Get path_input property value."""
+        return self._path_input.layout.display is None
+
+    @path_input.setter
+    def path_input(self, path_input: bool) -> None:
+        """Show or hide the typed path box."""
+        self._path_input.value = ''
+        self._path_input.layout.display = (None, 'none')[not path_input]
+
+    @property
+    def auto_refresh(self) -> bool:
+        """Get auto_refresh property value."""
+        return self._auto_refresh
+
+    @auto_refresh.setter
+    def auto_refresh(self, auto_refresh: bool) -> None:
+        """Set auto_refresh property value."""
+        self._auto_refresh = auto_refresh
+        self._update_watch()
 
     @property
     def rows(self) -> int:
@@ -480,51 +1425,39 @@ class FileChooser(VBox, ValueWidget):
     @property
     def default(self) -> str:
         """Get the default value."""
-        return os.path.join(self._default_path, self._default_filename)
+        return self._model.default
 
     @property
     def default_path(self) -> str:
         """Get the default_path value."""
-        return self._default_path
+        return self._model.default_path
 
     @default_path.setter
     def default_path(self, path: str) -> None:
         """Set the default_path."""
-        # Check if path and sandbox_path align
-        if self._sandbox_path and not has_parent_path(normalize_path(path), self._sandbox_path):
-            raise ParentPathError(path, self._sandbox_path)
-
-        self._default_path = normalize_path(path)
-        self._set_form_values(self._default_path, self._filename.value)
+        self._model.default_path = path
+        self._set_form_values(self._model.default_path, self._form_filename())
 
     @property
     def default_filename(self) -> str:
         """Get the default_filename value."""
-        return self._default_filename
+        return self._model.default_filename
 
     @default_filename.setter
     def default_filename(self, filename: str) -> None:
         """Set the default_filename."""
-        # Verify the filename is valid
-        if not is_valid_filename(filename):
-            raise InvalidFileNameError(filename)
-
-        self._default_filename = filename
-        self._set_form_values(self._expand_path(self._pathlist.value), self._default_filename)
+        self._model.default_filename = filename
+        self._set_form_values(self._form_path(), self._model.default_filename)
 
     @property
     def sandbox_path(self) -> Optional[str]:
         """Get the sandbox_path."""
-        return self._sandbox_path
+        return self._model.sandbox_path
 
     @sandbox_path.setter
-    def sandbox_path(self, sandbox_path: str) -> None:
+    def sandbox_path(self, sandbox_path: Optional[str]) -> None:
         """Set the sandbox_path."""
-        # Check if path and sandbox_path align
-        if sandbox_path and not has_parent_path(self._default_path, normalize_path(sandbox_path)):
-            raise ParentPathError(self._default_path, sandbox_path)
-
-        self._sandbox_path = normalize_path(sandbox_path) if sandbox_path is not None else None
+        self._model.sandbox_path = sandbox_path
 
         # Reset the dialog
         self.reset()
@@ -532,91 +1465,126 @@ class FileChooser(VBox, ValueWidget):
     @property
     def show_only_dirs(self) -> bool:
         """Get show_only_dirs property value."""
-        return self._show_only_dirs
+        return self._model.show_only_dirs
 
     @show_only_dirs.setter
     def show_only_dirs(self, show_only_dirs: bool) -> None:
         """Set show_only_dirs property value."""
-        self._show_only_dirs = show_only_dirs
+        self._model.show_only_dirs = show_only_dirs
 
         # Update widget layout
-        self._filename.disabled = self._show_only_dirs
-        self._filename.layout.display = (None, "none")[self._show_only_dirs]
+        self._update_mode_layout()
         self._gb.layout.children = [
             self._pathlist,
             self._dircontent
         ]
 
-        if not self._show_only_dirs:
+        if not self._model.show_only_dirs:
             self._gb.layout.children.insert(1, self._filename)
 
-        self._gb.layout.grid_template_areas = '''
-            'pathlist {}'
-            'dircontent dircontent'
-            '''.format(('filename', 'pathlist')[self._show_only_dirs])
+        # Reset the dialog
+        self.reset()
+
+    @property
+    def multiple(self) -> bool:
+        """Get multiple property value."""
+        return self._model.multiple
+
+    @multiple.setter
+    def multiple(self, multiple: bool) -> None:
+        """Set multiple property value."""
+        self._model.multiple = multiple
+        self._update_mode_layout()
 
         # Reset the dialog
         self.reset()
 
+    def _update_mode_layout(self) -> None:
+        """Show the filename field and bulk selection actions only in the modes that use them."""
+        hide_filename = self._model.show_only_dirs or self._model.multiple
+        self._filename.disabled = hide_filename
+        self._filename.layout.display = (None, "none")[hide_filename]
+        self._bulk.layout.display = (None, 'none')[not self._model.multiple]
+        self._mark_folder.layout.display = (None, 'none')[not (self._model.multiple and self._model.show_only_dirs)]
+        self._gb.layout.grid_template_areas = self._GRID_AREAS.format(('filename', 'pathlist')[hide_filename])
+
     @property
     def filter_pattern(self) -> Optional[Sequence[str]]:
         """Get file name filter pattern."""
-        return self._filter_pattern
+        return self._model.filter_pattern
 
     @filter_pattern.setter
     def filter_pattern(self, filter_pattern: Optional[Sequence[str]]) -> None:
         """Set file name filter pattern."""
-        self._filter_pattern = filter_pattern
-        self.refresh()
+        self._model.filter_pattern = filter_pattern
+        self._redisplay()
 
     @property
-    def value(self) -> Optional[str]:
-        """Get selected value."""
-        return self.selected
+    def filter_case_sensitive(self) -> bool:
+        """Get filter_case_sensitive property value."""
+        return self._model.filter_case_sensitive
+
+    @filter_case_sensitive.setter
+    def filter_case_sensitive(self, filter_case_sensitive: bool) -> None:
+        """Set filter_case_sensitive property value."""
+        self._model.filter_case_sensitive = filter_case_sensitive
+        self._redisplay()
 
     @property
-    def selected(self) -> Optional[str]:
+    def value(self) -> Union[str, List[str], None]:
         """Get selected value."""
-        selected = None
-
-        if ((self._selected_path is not None) and (self._selected_filename is not None)):
-            selected = os.path.join(self._selected_path, self._selected_filename)
+        return self.selected
 
-        return selected
+    @property
+    def selected(self) -> Union[str, List[str], None]:
+        """Get selected value, a list of paths in multiple mode."""
+        return self._model.selected
 
     @property
     def selected_path(self) -> Optional[str]:
         """Get selected_path value."""
-        return self._selected_path
+        return self._model.selected_path
 
     @property
     def selected_filename(self) -> Optional[str]:
         """Get the selected_filename."""
-        return self._selected_filename
+        return self._model.selected_filename
 
     def __repr__(self) -> str:
         """Build string representation."""
-        properties = f"path='{self._default_path}'"
-        properties += f", filename='{self._default_filename}'"
+        properties = f"path='{self._model.default_path}'"
+        properties += f", filename='{self._model.default_filename}'"
         properties += f", title='{self._title.value}'"
-        properties += f", show_hidden={self._show_hidden}"
+        properties += f", show_hidden={self._model.show_hidden}"
         properties += f", select_desc='{self._select_desc}'"
         properties += f", change_desc='{self._change_desc}'"
         properties += f", select_default={self._select_default}"
-        properties += f", show_only_dirs={self._show_only_dirs}"
-        properties += f", dir_icon_append={self._dir_icon_append}"
+        properties += f", show_only_dirs={self._model.show_only_dirs}"
+        properties += f", dir_icon_append={self._model.dir_icon_append}"
+
+        if self._model.multiple:
+            properties += f", multiple={self._model.multiple}"
 
-        if self._sandbox_path is not None:
-            properties += f", sandbox_path='{self._sandbox_path}'"
+        if self._model.sandbox_path is not None:
+            properties += f", sandbox_path='{self._model.sandbox_path}'"
 
-        if self._dir_icon:
-            properties += f", dir_icon='{self._dir_icon}'"
+        if self._model.sort_by != 'name':
+            properties += f", sort_by='{self._model.sort_by}'"
 
-        if self._filter_pattern:
-            if isinstance(self._filter_pattern, str):
-                properties += f", filter_pattern='{self._filter_pattern}'"
+        if self._model.show_details:
+            properties += f", show_details={self._model.show_details}"
+
+        if self._model.dir_icon:
+            properties += f", dir_icon='{self._model.dir_icon}'"
+
+        if self._model.filter_pattern:
+            if isinstance(self._model.filter_pattern, str):
+                properties += f", filter_pattern='{self._model.filter_pattern}'"
             else:
-                properties += f", filter_pattern={self._filter_pattern}"
+                properties += f", filter_pattern={self._model.filter_pattern}"
+
+            if self._model.filter_case_sensitive:
+                properties += f", filter_case_sensitive={self._model.filter_case_sensitive}"
 
         return f"{self.__class__.__name__}({properties})"
 
@@ -624,6 +1592,6 @@ class FileChooser(VBox, ValueWidget):
         """Register a callback function."""
         self._callback = callback
 
-    def get_interact_value(self) -> Optional[str]:
+    def get_interact_value(self) -> Union[str, List[str], None]:
         """Return the value which should be passed to interactive functions."""
         return self.selected
@@ -0,0 +1,219 @@
+"""Prebuilt folder indexes for browsing large read-only trees without touching the filesystem."""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from multiprocessing import Pool
+from typing import Iterable, Iterator, List, Optional, Tuple
+from .backends import FileSystemBackend, MetadataRow
+from .utils import has_parent_path, strip_parent_path
+
+_SCHEMA = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE entries (
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    link TEXT,
+    PRIMARY KEY (parent, name)
+) WITHOUT ROWID;
+'''
+
+
+# (name, is_dir, size, mtime_ns, symlink target)
+Row = Tuple[str, bool, Optional[int], Optional[int], Optional[str]]
+
+
+def _scan_with_stats(path: str) -> Tuple[str, List[Row]]:
+    """Read a folder and return its rows."""
+    rows = []
+
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                link = os.path.realpath(entry.path) if entry.is_symlink() else None
+
+                try:
+                    st = entry.stat()
+                    rows.append((entry.name, entry.is_dir(), st.st_size, st.st_mtime_ns, link))
+                except OSError:
+                    # Broken symlinks and entries removed while scanning
+                    rows.append((entry.name, False, None, None, link))
+    except OSError:
+        pass
+
+    return path, rows
+
+
+def _walk(root: str, processes: int) -> Iterator[Tuple[str, List[Row]]]:
+    """Scan a tree level by level, spreading the folders of each level over worker processes."""
+    level = [root]
+    pool = Pool(processes) if processes > 1 else None
+
+    try:
+        while level:
+            if pool is not None:
+                results: Iterable = pool.imap_unordered(_scan_with_stats, level, chunksize=16)
+            else:
+                results = map(_scan_with_stats, level)
+
+            next_level = []
+
+            for path, rows in results:
+                yield path, rows
+
+                # Symlinked folders are indexed at their target, like os.walk
+                next_level.extend(os.path.join(path, row[0]) for row in rows if row[1] and row[4] is None)
+
+            level = next_level
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def build_index(root: str, index_file: str, processes: int = 1) -> int:
+    """Index every folder below root into a SQLite file, returning the number of entries."""
+    root = os.path.realpath(root)
+    tmp_file = f'{index_file}.tmp'
+
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+
+    conn = sqlite3.connect(tmp_file)
+    count = 0
+
+    try:
+        conn.executescript(_SCHEMA)
+
+        for path, rows in _walk(root, processes):
+            conn.executemany(
+                'INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                [(path, *row) for row in rows]
+            )
+            count += len(rows)
+
+        conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+            ('root', root),
+            ('built_at', str(time.time())),
+            ('entries', str(count))
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+    # Replace the previous index atomically so readers never see a partial file
+    os.replace(tmp_file, index_file)
+
+    return count
+
+
+class IndexBackend(FileSystemBackend):
+    """Answers listings and path checks from an index written by build_index."""
+
+    def __init__(self, index_file: str):
+        self.index_file = index_file
+        self._conn = sqlite3.connect(f'file:{index_file}?mode=ro', uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        meta = dict(self._query('SELECT key, value FROM meta'))
+        self.root = meta['root']
+        self.built_at = float(meta['built_at'])
+
+    def _query(self, sql: str, *params) -> List[tuple]:
+        """Run a query on the shared connection."""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _lookup(self, path: str) -> Optional[bool]:
+        """Get whether an indexed path is a folder, or None if it is not indexed."""
+        if path == self.root:
+            return True
+
+        parent, name = os.path.split(path)
+        row = self._query('SELECT is_dir FROM entries WHERE parent = ? AND name = ?', parent, name)
+
+        return bool(row[0][0]) if row else None
+
+    def scandir(self, path: str) -> List[Tuple[str, bool]]:
+        """List a folder from the index."""
+        path = self.realpath(path)
+        rows = self._query('SELECT name, is_dir FROM entries WHERE parent = ?', path)
+
+        if not rows:
+            is_dir = self._lookup(path)
+
+            if is_dir is None:
+                raise FileNotFoundError(path)
+            if not is_dir:
+                raise NotADirectoryError(path)
+
+        return [(name, bool(is_dir)) for name, is_dir in rows]
+
+    def scandir_metadata(self, path: str) -> List[MetadataRow]:
+        """List a folder with the sizes and modification times recorded in the index."""
+        path = self.realpath(path)
+        rows = self._query('SELECT name, is_dir, size, mtime_ns FROM entries WHERE parent = ?', path)
+
+        if not rows:
+            self.scandir(path)
+
+        return [(name, bool(is_dir), size, mtime_ns) for name, is_dir, size, mtime_ns in rows]
+
+    def stat_key(self, path: str) -> float:
+        """Get the index build time, as indexed folders only change when the index is rebuilt."""
+        if not self._lookup(self.realpath(path)):
+            raise FileNotFoundError(path)
+
+        return self.built_at
+
+    def realpath(self, path: str) -> str:
+        """Normalize a path against the indexed root, resolving indexed symlinks."""
+        path = os.path.normpath(os.path.join(self.root, path))
+
+        if not has_parent_path(path, self.root):
+            return path
+
+        resolved = self.root
+
+        for name in strip_parent_path(path, self.root).split(os.sep):
+            if name:
+                row = self._query('SELECT link FROM entries WHERE parent = ? AND name = ?', resolved, name)
+
+                # Links leaving the indexed tree are kept as they are, as their targets were not indexed
+                if row and row[0][0] and has_parent_path(row[0][0], self.root):
+                    resolved = row[0][0]
+                else:
+                    resolved = os.path.join(resolved, name)
+
+        return resolved
+
+    def isdir(self, path: str) -> bool:
+        """Check if a path is an indexed folder."""
+        return self._lookup(self.realpath(path)) is True
+
+    def isfile(self, path: str) -> bool:
+        """Check if a path is an indexed file."""
+        return self._lookup(self.realpath(path)) is False
+
+    def close(self) -> None:
+        """Close the index file."""
+        self._conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build a FileChooser index of a folder tree.')
+    parser.add_argument('root', help='folder to index')
+    parser.add_argument('index_file', help='SQLite file to write')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes used to read folders')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = build_index(args.root, args.index_file, args.processes)
+    print(f'Indexed {count} entries in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
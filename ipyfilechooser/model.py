@@ -0,0 +1,582 @@
+"""Widget-free navigation state and logic behind FileChooser."""
+import os
+import time
+from contextlib import nullcontext
+from typing import ContextManager, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from .backends import FileSystemBackend, CachedBackend, get_default_backend
+from .cache import ListingCache, get_shared_cache
+from .errors import ParentPathError, InvalidFileNameError
+from .stats import Stats
+from .utils import DirListing, FilterMatcher, Metadata, PackedEntries, filter_entries, make_dir_listing, get_subpaths
+from .utils import SORT_MODES, get_drive_letters, has_parent_path, is_valid_filename, normalize_path, strip_parent_path
+
+# Shared no-op context for phases when instrumentation is disabled
+_NO_PHASE = nullcontext()
+
+
+class FileChooserModel:
+    """Paths, options, listings and selection of a file chooser, usable without ipywidgets."""
+
+    def __init__(
+            self,
+            path: str = os.getcwd(),
+            filename: str = '',
+            show_hidden: bool = False,
+            dir_icon: Optional[str] = '\U0001F4C1 ',
+            dir_icon_append: bool = False,
+            show_only_dirs: bool = False,
+            filter_pattern: Optional[Sequence[str]] = None,
+            filter_case_sensitive: bool = False,
+            sandbox_path: Optional[str] = None,
+            sort_by: str = 'name',
+            show_details: bool = False,
+            cache_size: int = 32,
+            cache_max_entries: int = 200000,
+            shared_cache: bool = True,
+            multiple: bool = False,
+            path_cache_ttl: float = 10.0,
+            path_cache_size: int = 4096,
+            scan_timeout: Optional[float] = None,
+            failure_ttl: float = 30.0,
+            backend: Optional[FileSystemBackend] = None,
+            stats: Optional[Stats] = None):
+        self.backend = backend if backend is not None else get_default_backend()
+        # Resolved real paths and sandbox mappings, kept for path_cache_ttl seconds so that symlink
+        # changes are picked up without checking on every click. Folder and file checks are not
+        # cached, as a missing path may be created at any time.
+        self.path_cache = CachedBackend(self.backend, ttl=path_cache_ttl, max_items=path_cache_size)
+
+        default_path = self.normalize_path(path)
+        normalized_sandbox = self.normalize_path(sandbox_path) if sandbox_path is not None else None
+
+        # Check if path and sandbox_path align
+        if sandbox_path and not has_parent_path(default_path, normalized_sandbox):
+            raise ParentPathError(path, sandbox_path)
+
+        # Verify the filename is valid
+        if not is_valid_filename(filename):
+            raise InvalidFileNameError(filename)
+
+        if sort_by not in SORT_MODES:
+            raise ValueError(f'sort_by must be one of {SORT_MODES}, not {sort_by!r}')
+
+        self._default_path = default_path
+        self._default_filename = filename
+        self._sandbox_path = normalized_sandbox
+        self._filter_pattern = filter_pattern
+        self._filter_case_sensitive = filter_case_sensitive
+        self._sort_by = sort_by
+        self.filter_matcher = self._compile_filter()
+        self.show_hidden = show_hidden
+        self.dir_icon = dir_icon
+        self.dir_icon_append = dir_icon_append
+        self.show_only_dirs = show_only_dirs
+        self.show_details = show_details
+        self.scan_timeout = scan_timeout
+        self.stats = stats
+        self.selected_path: Optional[str] = None
+        self.selected_filename: Optional[str] = None
+        self.multiple = multiple
+        # Insertion ordered sets of full paths: marked in the open form, and applied
+        self.marked: Dict[str, None] = {}
+        self.selected_paths: Dict[str, None] = {}
+        # The folder, filename and listing currently shown
+        self.path = self._default_path
+        self.filename = filename
+        self.listing: Optional[DirListing] = None
+
+        # Models on the same backend share listings unless caching is disabled
+        if shared_cache and cache_size > 0:
+            self.cache = get_shared_cache(self.backend, cache_size, cache_max_entries, failure_ttl)
+        else:
+            self.cache = ListingCache(
+                max_dirs=cache_size,
+                max_entries=cache_max_entries,
+                backend=self.backend,
+                failure_ttl=failure_ttl
+            )
+
+    def _compile_filter(self) -> Optional[FilterMatcher]:
+        """Build the matcher for the current filter pattern."""
+        if not self._filter_pattern:
+            return None
+
+        return FilterMatcher(self._filter_pattern, self._filter_case_sensitive)
+
+    def phase(self, name: str, path: Optional[str] = None) -> ContextManager:
+        """Time a navigation phase when instrumentation is enabled."""
+        if self.stats is None:
+            return _NO_PHASE
+
+        return self.stats.phase(name, path)
+
+    def normalize_path(self, path: str) -> str:
+        """Normalize a path using the filesystem backend."""
+        return normalize_path(path, self.backend)
+
+    def expand_path(self, path: str) -> str:
+        """Calculate the full path using the sandbox path."""
+        if self._sandbox_path:
+            path = os.path.join(self._sandbox_path, path.lstrip(os.sep))
+
+        return path
+
+    def restrict_path(self, path: str) -> str:
+        """Calculate the sandboxed path using the sandbox path."""
+        if self._sandbox_path == os.sep:
+            pass
+        elif self._sandbox_path == path:
+            path = os.sep
+        elif self._sandbox_path:
+            if os.path.splitdrive(self._sandbox_path)[0] and len(self._sandbox_path) == 3:
+                # If the value is 'c:\\', strip 'c:' so we retain the leading os.sep char
+                path = strip_parent_path(path, os.path.splitdrive(self._sandbox_path)[0])
+            else:
+                path = strip_parent_path(path, self._sandbox_path)
+
+        return path
+
+    def in_sandbox(self, path: str) -> bool:
+        """Check if a path falls inside the sandbox path."""
+        if not self._sandbox_path:
+            return True
+
+        return self.path_cache.cached('in_sandbox', path, self._has_sandbox_parent)
+
+    def _has_sandbox_parent(self, path: str) -> bool:
+        """Check if a path falls under the sandbox path."""
+        return has_parent_path(path, self._sandbox_path)
+
+    def check_path(self, path: str) -> None:
+        """Raise ParentPathError if a path falls outside the sandbox path."""
+        with self.phase('path_resolution', path):
+            if not self.in_sandbox(path):
+                raise ParentPathError(path, self._sandbox_path)
+
+    def get_subpaths(self, path: str) -> Tuple[str, List[str]]:
+        """Get the sandboxed form of a folder and the sandboxed folders above it."""
+        with self.phase('path_resolution', path):
+            return self.path_cache.cached('subpaths', path, self._get_subpaths)
+
+    def _get_subpaths(self, path: str) -> Tuple[str, List[str]]:
+        """Resolve the sandboxed form of a folder and the sandboxed folders above it."""
+        restricted_path = self.restrict_path(path)
+        # Navigation only ever shows folders, and checking the path could hang on a dead mount
+        subpaths = get_subpaths(restricted_path, self.backend, check_file=False)
+
+        if os.path.splitdrive(subpaths[-1])[0]:
+            # Add missing Windows drive letters
+            drives = get_drive_letters()
+            subpaths.extend(list(set(drives) - set(subpaths)))
+
+        return restricted_path, subpaths
+
+    def typed_path(self, text: str, base: Optional[str] = None) -> Optional[str]:
+        """Resolve a typed path to a real path inside the sandbox path, or None if it falls outside.
+
+        Absolute paths outside the sandbox path are taken as sandbox-relative, other paths as relative to base,
+        which defaults to the current folder. Resolving is bounded by the scan timeout, as paths are typed
+        onto dead mounts too.
+        """
+        text = os.path.expanduser(text.strip())
+
+        if not text:
+            return None
+
+        if not os.path.isabs(text):
+            text = os.path.join(base if base is not None else self.path, text)
+        elif self._sandbox_path and not has_parent_path(os.path.normpath(text), self._sandbox_path):
+            text = self.expand_path(text)
+
+        path = self.cache.run(text, self.scan_timeout, self.path_cache.realpath)
+
+        return path if self.in_sandbox(path) else None
+
+    def resolve(self, text: str, base: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """Get the folder and filename a typed path leads to, or None if it does not name an allowed entry.
+
+        Paths that can not be checked within the scan timeout are marked as failed and lead nowhere.
+        """
+        try:
+            path = self.typed_path(text, base)
+
+            if path is None:
+                return None
+
+            return self.cache.run(path, self.scan_timeout, self._typed_target)
+        except OSError:
+            return None
+
+    def _typed_target(self, path: str) -> Optional[Tuple[str, str]]:
+        """Get the folder and filename a resolved typed path leads to, or None if it does not name an allowed entry."""
+        if self.backend.isdir(path):
+            return path, ''
+
+        if not self.show_only_dirs and self.backend.isfile(path):
+            return os.path.split(path)
+
+        return None
+
+    def complete(self, text: str, limit: int = 20, base: Optional[str] = None) -> List[str]:
+        """Get typed path completions from the scan of the folder being typed, reading it only if not cached."""
+        separators = [os.sep] + ([os.altsep] if os.altsep else [])
+        split = max(text.rfind(separator) for separator in separators) + 1
+        head, prefix = text[:split], text[split:]
+        try:
+            folder = self.typed_path(head, base) if head else (base if base is not None else self.path)
+
+            # Folders that failed recently are skipped without touching the backend
+            if folder is None or not self.cache.run(folder, self.scan_timeout, self.backend.isdir):
+                return []
+        except OSError:
+            return []
+
+        # The shown folder keeps its scan even when it is too large for the cache
+        if self.listing is not None and self.listing.path == folder:
+            entries = self.listing.entries
+        else:
+            try:
+                entries = self.cache.scan(folder, self.scan_timeout)
+            except OSError:
+                return []
+
+        completions = []
+
+        for name, is_dir in entries.prefixed(prefix):
+            if name.startswith('.') and not (self.show_hidden or prefix.startswith('.')):
+                continue
+
+            if is_dir:
+                completions.append(head + name + os.sep)
+            elif not self.show_only_dirs and (self.filter_matcher is None or self.filter_matcher(name)):
+                completions.append(head + name)
+
+            if len(completions) >= limit:
+                break
+
+        return completions
+
+    def list_dir(
+            self,
+            path: str,
+            entries: Optional[Iterable[Tuple[str, bool]]] = None,
+            metadata: Optional[Metadata] = None) -> DirListing:
+        """Read a folder, or build a listing from scanned entries, using the current display options."""
+        if entries is None:
+            with self.phase('listing', path):
+                start = time.perf_counter()
+
+                if self._sort_by != 'name' or self.show_details:
+                    entries, metadata = self.cache.scan_metadata(path, self.scan_timeout)
+                else:
+                    entries = self.cache.scan(path, self.scan_timeout)
+
+                if self.stats is not None:
+                    self.stats.record_listing(path, time.perf_counter() - start, len(entries))
+
+        # Entries streamed in batches are packed like cached scans
+        if not isinstance(entries, PackedEntries):
+            entries = PackedEntries(entries)
+
+        with self.phase('filtering', path):
+            dirs, files = filter_entries(entries, self.show_hidden, self.show_only_dirs, self.filter_matcher)
+
+        with self.phase('sorting', path):
+            listing = make_dir_listing(
+                path,
+                entries,
+                dirs,
+                files,
+                self.dir_icon,
+                self.dir_icon_append,
+                self._sandbox_path,
+                metadata,
+                self._sort_by,
+                self.show_details
+            )
+
+        return listing
+
+    def relist(self) -> Optional[DirListing]:
+        """Rebuild the current listing from its scan after a display option changed, or None if a read is needed."""
+        listing = self.listing
+
+        if listing is None:
+            return None
+
+        # Sizes and mtimes are only read when they are needed
+        if listing.metadata is None and (self._sort_by != 'name' or self.show_details):
+            return None
+
+        self.listing = self.list_dir(listing.path, listing.entries, listing.metadata)
+
+        return self.listing
+
+    def failure(self, path: str) -> Optional[OSError]:
+        """Get the error of a folder that recently could not be listed or timed out."""
+        return self.cache.failure(path)
+
+    def can_select(self, path: str, filename: str, listing: DirListing) -> bool:
+        """Check if a filename in a listed folder can be selected."""
+        if self.multiple:
+            return bool(self.marked)
+
+        # Disallow selecting path and filename if they
+        # - equal an existing folder in the current view
+        # - contains an invalid character sequence
+        # - equal the already selected values
+        # - don't match the provided filter pattern(s)
+        check1 = filename in listing
+        check2 = listing.entry_is_dir(filename)
+        check3 = not is_valid_filename(filename)
+        check4 = False
+        check5 = False
+
+        # Only check selected if selected is set
+        if self.selected is not None:
+            check4 = os.path.join(path, filename) == self.selected
+
+        # Ensure only allowed extensions are used
+        if self.filter_matcher is not None:
+            check5 = not self.filter_matcher(filename)
+
+        return not ((check1 and check2) or check3 or check4 or check5)
+
+    def read(self, path: str, filename: Optional[str] = None) -> Tuple[str, Optional[str], DirListing]:
+        """List a folder inside the sandbox path without making it the current folder."""
+        self.check_path(path)
+
+        return path, filename, self.list_dir(path)
+
+    def resolve_entry(self, name: str, is_dir: Optional[bool] = None) -> Tuple[str, Optional[str]]:
+        """Get the folder and filename that opening an entry of the current folder leads to.
+
+        is_dir defaults to the type of the entry in the current listing. Folders are resolved to their
+        real path under the scan timeout, as a dead mount can hang there too.
+        """
+        if is_dir is None:
+            is_dir = self.listing is None or name not in self.listing or self.listing.entry_is_dir(name)
+
+        if not is_dir:
+            return self.path, name
+
+        return self.cache.run(os.path.join(self.path, name), self.scan_timeout, self.path_cache.realpath), None
+
+    def read_entry(self, name: str) -> Tuple[str, Optional[str], DirListing]:
+        """List the folder that opening an entry of the current listing leads to, without opening it."""
+        return self.read(*self.resolve_entry(name))
+
+    def apply(self, path: str, filename: Optional[str], listing: DirListing) -> DirListing:
+        """Make a listed folder the current folder, keeping the filename unless one is given."""
+        self.path = path
+        self.listing = listing
+
+        if filename is not None:
+            self.filename = filename
+
+        # In folder only mode zero out the filename
+        if self.show_only_dirs:
+            self.filename = ''
+
+        return listing
+
+    def navigate(self, path: str, filename: Optional[str] = None) -> DirListing:
+        """List a folder and make it the current folder, keeping the filename unless one is given."""
+        return self.apply(*self.read(path, filename))
+
+    def open(self, name: str) -> DirListing:
+        """Enter a folder of the current listing, or pick a file from it as the filename."""
+        return self.apply(*self.read_entry(name))
+
+    def select(self, path: Optional[str] = None, filename: Optional[str] = None) -> Union[str, List[str], None]:
+        """Make a path and filename, by default the current ones, the selected value.
+
+        In multiple mode the marked paths become the selection instead.
+        """
+        self.selected_path = path if path is not None else self.path
+        self.selected_filename = filename if filename is not None else self.filename
+
+        if self.multiple:
+            self.selected_paths = dict(self.marked)
+
+        return self.selected
+
+    def selectable(self, listing: DirListing) -> List[str]:
+        """Get the names in a listing that multiple mode can mark: folders in folder only mode, files otherwise."""
+        return [
+            name
+            for name, is_dir in listing.iter_entries()
+            if self.is_selectable(name, is_dir)
+        ]
+
+    def is_selectable(self, name: str, is_dir: bool) -> bool:
+        """Check if multiple mode can mark a listed entry."""
+        return name != os.pardir and is_dir == self.show_only_dirs
+
+    def is_marked(self, path: str) -> bool:
+        """Check if a path is marked."""
+        return path in self.marked
+
+    def mark(self, path: str) -> None:
+        """Mark a path."""
+        self.marked[path] = None
+
+    def toggle(self, path: str) -> bool:
+        """Mark or unmark a path, returning whether it is marked now."""
+        if path in self.marked:
+            del self.marked[path]
+            return False
+
+        self.marked[path] = None
+        return True
+
+    def mark_all(self, pattern: Optional[Sequence[str]] = None) -> int:
+        """Mark the selectable entries of the current listing, or those matching a pattern, returning the count."""
+        if self.listing is None:
+            return 0
+
+        matcher = FilterMatcher(pattern, self._filter_case_sensitive) if pattern else None
+        count = len(self.marked)
+
+        for name in self.selectable(self.listing):
+            if matcher is None or matcher(name):
+                self.marked[os.path.join(self.listing.path, name)] = None
+
+        return len(self.marked) - count
+
+    def unmark_all(self) -> None:
+        """Unmark every path, in all folders."""
+        self.marked = {}
+
+    def restore_marks(self) -> None:
+        """Mark exactly the selected paths, discarding marks that were not applied."""
+        self.marked = dict(self.selected_paths)
+
+    def reset(self, path: Optional[str] = None, filename: Optional[str] = None) -> None:
+        """Clear the selection and go back to the default path and filename, optionally replacing them."""
+        default_path = self.normalize_path(path) if path is not None else None
+
+        # Check if path and sandbox_path align
+        if default_path is not None and not self.in_sandbox(default_path):
+            raise ParentPathError(path, self._sandbox_path)
+
+        # Verify the filename is valid
+        if filename is not None and not is_valid_filename(filename):
+            raise InvalidFileNameError(filename)
+
+        self.selected_path = None
+        self.selected_filename = None
+        self.marked = {}
+        self.selected_paths = {}
+
+        if default_path is not None:
+            self._default_path = default_path
+
+        if filename is not None:
+            self._default_filename = filename
+
+        self.path = self._default_path
+        self.filename = '' if self.show_only_dirs else self._default_filename
+        self.listing = None
+
+    @property
+    def selected(self) -> Union[str, List[str], None]:
+        """Get the selected path and filename joined, or the list of selected paths in multiple mode."""
+        if self.multiple:
+            return list(self.selected_paths)
+
+        selected = None
+
+        if ((self.selected_path is not None) and (self.selected_filename is not None)):
+            selected = os.path.join(self.selected_path, self.selected_filename)
+
+        return selected
+
+    @property
+    def default(self) -> str:
+        """Get the default value."""
+        return os.path.join(self._default_path, self._default_filename)
+
+    @property
+    def default_path(self) -> str:
+        """Get the default_path value."""
+        return self._default_path
+
+    @default_path.setter
+    def default_path(self, path: str) -> None:
+        """Set the default_path."""
+        default_path = self.normalize_path(path)
+
+        # Check if path and sandbox_path align
+        if not self.in_sandbox(default_path):
+            raise ParentPathError(path, self._sandbox_path)
+
+        self._default_path = default_path
+
+    @property
+    def default_filename(self) -> str:
+        """Get the default_filename value."""
+        return self._default_filename
+
+    @default_filename.setter
+    def default_filename(self, filename: str) -> None:
+        """Set the default_filename."""
+        # Verify the filename is valid
+        if not is_valid_filename(filename):
+            raise InvalidFileNameError(filename)
+
+        self._default_filename = filename
+
+    @property
+    def sandbox_path(self) -> Optional[str]:
+        """Get the sandbox_path."""
+        return self._sandbox_path
+
+    @sandbox_path.setter
+    def sandbox_path(self, sandbox_path: Optional[str]) -> None:
+        """Set the sandbox_path."""
+        normalized_sandbox = self.normalize_path(sandbox_path) if sandbox_path is not None else None
+
+        # Check if path and sandbox_path align
+        if sandbox_path and not has_parent_path(self._default_path, normalized_sandbox):
+            raise ParentPathError(self._default_path, sandbox_path)
+
+        self._sandbox_path = normalized_sandbox
+
+        # Sandbox mappings are only valid for the sandbox they were made for
+        self.path_cache.invalidate()
+
+    @property
+    def sort_by(self) -> str:
+        """Get sort_by property value."""
+        return self._sort_by
+
+    @sort_by.setter
+    def sort_by(self, sort_by: str) -> None:
+        """Sort by 'name', 'mtime' (newest first) or 'size' (largest first)."""
+        if sort_by not in SORT_MODES:
+            raise ValueError(f'sort_by must be one of {SORT_MODES}, not {sort_by!r}')
+
+        self._sort_by = sort_by
+
+    @property
+    def filter_pattern(self) -> Optional[Sequence[str]]:
+        """Get file name filter pattern."""
+        return self._filter_pattern
+
+    @filter_pattern.setter
+    def filter_pattern(self, filter_pattern: Optional[Sequence[str]]) -> None:
+        """Set file name filter pattern."""
+        self._filter_pattern = filter_pattern
+        self.filter_matcher = self._compile_filter()
+
+    @property
+    def filter_case_sensitive(self) -> bool:
+        """Get filter_case_sensitive property value."""
+        return self._filter_case_sensitive
+
+    @filter_case_sensitive.setter
+    def filter_case_sensitive(self, filter_case_sensitive: bool) -> None:
+        """Set filter_case_sensitive property value."""
+        self._filter_case_sensitive = filter_case_sensitive
+        self.filter_matcher = self._compile_filter()
@@ -0,0 +1,177 @@
+"""Background name index used to search a folder tree."""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Optional, Tuple
+from .backends import FileSystemBackend
+from .utils import has_parent_path
+
+
+def compile_query(query: str, fuzzy: bool = False) -> Callable[[str], Optional[re.Match]]:
+    """Compile a case-insensitive substring query, or a subsequence query when fuzzy."""
+    if fuzzy:
+        pattern = '.*?'.join(re.escape(char) for char in query)
+    else:
+        pattern = re.escape(query)
+
+    return re.compile(pattern, re.IGNORECASE).search
+
+
+class NameIndex:
+    """Names of every entry below a folder, collected incrementally by a background walker."""
+
+    # Entries checked per step while searching, so a superseded search stops quickly
+    _STEP = 50000
+
+    def __init__(self, root: str, backend: FileSystemBackend, max_entries: int = 1000000):
+        self.root = root
+        self.backend = backend
+        self.max_entries = max_entries
+        self.created = time.monotonic()
+        self.done = False
+        self.truncated = False
+        # Folder paths, and (folder index, name, is_dir, hidden) per entry
+        self._dirs: List[str] = []
+        self._entries: List[Tuple[int, str, bool, bool]] = []
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def start(self) -> None:
+        """Start walking in a background thread."""
+        threading.Thread(target=self._walk, name='ipyfilechooser-index', daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop walking, leaving the names found so far searchable."""
+        self._stop_event.set()
+
+    def _walk(self) -> None:
+        """Walk the tree breadth first, skipping unreadable folders and folders seen through symlinks.
+
+        Symlinked folders leading outside the root are skipped as well, so results stay inside a sandbox root.
+        """
+        level = [(self.root, False)]
+        real_root = self.backend.realpath(self.root)
+        seen = {real_root}
+
+        try:
+            while level and not self._stop_event.is_set():
+                next_level = []
+
+                for path, hidden in level:
+                    if self._stop_event.is_set():
+                        break
+
+                    try:
+                        entries = self.backend.scandir(path)
+                    except OSError:
+                        continue
+
+                    with self._cond:
+                        dir_index = len(self._dirs)
+                        self._dirs.append(path)
+
+                        for name, is_dir in entries:
+                            self._entries.append((dir_index, name, is_dir, hidden or name.startswith('.')))
+
+                        self._cond.notify_all()
+
+                    if len(self._entries) >= self.max_entries:
+                        self.truncated = True
+                        return
+
+                    for name, is_dir in entries:
+                        if is_dir:
+                            sub_path = os.path.join(path, name)
+
+                            try:
+                                real_path = self.backend.realpath(sub_path)
+                            except OSError:
+                                continue
+
+                            if real_path not in seen and has_parent_path(real_path, real_root):
+                                seen.add(real_path)
+                                next_level.append((sub_path, hidden or name.startswith('.')))
+
+                level = next_level
+        finally:
+            with self._cond:
+                self.done = True
+                self._cond.notify_all()
+
+    def search(
+            self,
+            match: Callable[[str], object],
+            under: Optional[str] = None,
+            stopped: Optional[Callable[[], bool]] = None) -> Iterator[List[Tuple[str, bool, bool]]]:
+        """Yield batches of matching (path, is_dir, hidden) tuples, waiting for the walker until it is done."""
+        position = 0
+        prefix = None if under is None or under == self.root else os.path.join(under, '')
+
+        while True:
+            with self._cond:
+                while position >= len(self._entries) and not self.done:
+                    self._cond.wait(0.2)
+
+                    if stopped is not None and stopped():
+                        return
+
+                end = min(len(self._entries), position + self._STEP)
+                finished = self.done and end == len(self._entries)
+
+            batch = []
+
+            for dir_index, name, is_dir, hidden in self._entries[position:end]:
+                if match(name):
+                    path = os.path.join(self._dirs[dir_index], name)
+
+                    if prefix is None or path.startswith(prefix):
+                        batch.append((path, is_dir, hidden))
+
+            position = end
+
+            if batch:
+                yield batch
+
+            if finished or (stopped is not None and stopped()):
+                return
+
+
+# Indexes shared by all choosers, most recently used last
+_indexes: 'OrderedDict[Tuple[int, str], NameIndex]' = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_name_index(
+        root: str,
+        backend: FileSystemBackend,
+        max_age: float = 300.0,
+        max_indexes: int = 4) -> NameIndex:
+    """Get a shared index covering root, reusing an index of root or of a parent folder while it is fresh."""
+    now = time.monotonic()
+
+    with _indexes_lock:
+        for key, index in reversed(_indexes.items()):
+            if index.backend is backend and has_parent_path(root, index.root):
+                if now - index.created < max_age:
+                    _indexes.move_to_end(key)
+                    return index
+
+                index.stop()
+                del _indexes[key]
+                break
+
+        index = NameIndex(root, backend)
+        _indexes[(id(backend), root)] = index
+
+        while len(_indexes) > max_indexes:
+            _, evicted = _indexes.popitem(last=False)
+            evicted.stop()
+
+    index.start()
+
+    return index
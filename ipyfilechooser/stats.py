@@ -0,0 +1,109 @@
+"""Opt-in instrumentation for FileChooser."""
+import heapq
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger('ipyfilechooser')
+
+
+class Stats:
+    """Collects phase timings, per-folder listing times and the slowest folders seen."""
+
+    def __init__(
+            self,
+            hook: Optional[Callable[[Mapping[str, Any]], None]] = None,
+            max_dirs: int = 100,
+            max_slowest: int = 10):
+        self.hook = hook
+        self.max_dirs = max_dirs
+        self.max_slowest = max_slowest
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all collected values."""
+        with self._lock:
+            self._phases: Dict[str, List[float]] = {}
+            self._dirs: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+            self._slowest: List[Tuple[float, str, int]] = []
+            self._listings = 0
+            self._listing_time = 0.0
+            self._entries = 0
+
+    @contextmanager
+    def phase(self, name: str, path: Optional[str] = None) -> Iterator[None]:
+        """Time a phase of a navigation."""
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - start, path)
+
+    def record_phase(self, name: str, seconds: float, path: Optional[str] = None) -> None:
+        """Add a phase timing as [count, total, max]."""
+        with self._lock:
+            phase = self._phases.setdefault(name, [0, 0.0, 0.0])
+            phase[0] += 1
+            phase[1] += seconds
+            phase[2] = max(phase[2], seconds)
+
+        if self.hook is not None:
+            self.hook({'event': 'phase', 'phase': name, 'path': path, 'seconds': seconds})
+
+    def record_listing(self, path: str, seconds: float, entries: int) -> None:
+        """Add the time taken to list a folder and its number of entries."""
+        with self._lock:
+            self._listings += 1
+            self._listing_time += seconds
+            self._entries += entries
+
+            folder = self._dirs.pop(path, None) or {'count': 0, 'max_seconds': 0.0}
+            folder['count'] += 1
+            folder['last_seconds'] = seconds
+            folder['max_seconds'] = max(folder['max_seconds'], seconds)
+            folder['entries'] = entries
+            self._dirs[path] = folder
+
+            if len(self._dirs) > self.max_dirs:
+                self._dirs.popitem(last=False)
+
+            if len(self._slowest) < self.max_slowest:
+                heapq.heappush(self._slowest, (seconds, path, entries))
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, (seconds, path, entries))
+
+        if self.hook is not None:
+            self.hook({'event': 'listing', 'path': path, 'seconds': seconds, 'entries': entries})
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get a snapshot of the collected values."""
+        with self._lock:
+            return {
+                'phases': {
+                    name: {'count': count, 'total_seconds': total, 'max_seconds': longest}
+                    for name, (count, total, longest) in self._phases.items()
+                },
+                'listings': {
+                    'count': self._listings,
+                    'total_seconds': self._listing_time,
+                    'entries': self._entries
+                },
+                'directories': {path: dict(folder) for path, folder in self._dirs.items()},
+                'slowest': [
+                    {'path': path, 'seconds': seconds, 'entries': entries}
+                    for seconds, path, entries in sorted(self._slowest, reverse=True)
+                ]
+            }
+
+
+def log_stats_hook(record: Mapping[str, Any]) -> None:
+    """Stats hook that emits each record on the 'ipyfilechooser' logger at DEBUG level."""
+    if record['event'] == 'listing':
+        logger.debug('listed %s: %d entries in %.3fs', record['path'], record['entries'], record['seconds'])
+    else:
+        logger.debug('%s phase for %s took %.3fs', record['phase'], record['path'], record['seconds'])
@@ -1,15 +1,28 @@
 """Helper functions for ipyfilechooser."""
 import fnmatch
 import os
+import re
 import string
 import sys
-from typing import List, Sequence, Iterable, Optional
+import time
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Sequence, Iterable, Iterator, Optional, Tuple, Union
 from .errors import InvalidPathError
 
+if TYPE_CHECKING:
+    from .backends import FileSystemBackend
 
-def get_subpaths(path: str) -> List[str]:
-    """Walk a path and return a list of subpaths."""
-    if os.path.isfile(path):
+# Size and mtime in nanoseconds by entry name, None where unknown
+Metadata = Dict[str, Tuple[Optional[int], Optional[int]]]
+
+SORT_MODES = ('name', 'mtime', 'size')
+
+
+def get_subpaths(path: str, backend: Optional['FileSystemBackend'] = None, check_file: bool = True) -> List[str]:
+    """Walk a path and return a list of subpaths, starting from the folder of a file path unless check_file is off."""
+    if check_file and (backend.isfile(path) if backend is not None else os.path.isfile(path)):
         path = os.path.dirname(path)
 
     paths = [path]
@@ -47,19 +60,423 @@ def strip_parent_path(path: str, parent_path: Optional[str]) -> str:
     return stripped_path
 
 
-def match_item(item: str, filter_pattern: Sequence[str]) -> bool:
+class FilterMatcher:
+    """Precompiled matcher for fnmatch include patterns and '!' prefixed exclude patterns."""
+
+    def __init__(self, filter_pattern: Sequence[str], case_sensitive: bool = False):
+        if isinstance(filter_pattern, str):
+            filter_pattern = [filter_pattern]
+
+        self.filter_pattern = filter_pattern
+        self.case_sensitive = case_sensitive
+        include = [pattern for pattern in filter_pattern if not pattern.startswith('!')]
+        exclude = [pattern[1:] for pattern in filter_pattern if pattern.startswith('!')]
+        self._include = self._compile(include, case_sensitive)
+        self._exclude = self._compile(exclude, case_sensitive)
+
+    @staticmethod
+    def _compile(patterns: Sequence[str], case_sensitive: bool) -> Optional[Callable[[str], Any]]:
+        """Fold fnmatch patterns into a single regex match function."""
+        if not patterns:
+            return None
+
+        flags = 0 if case_sensitive else re.IGNORECASE
+        return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns), flags).match
+
+    def __call__(self, item: str) -> bool:
+        if self._include is not None and self._include(item) is None:
+            return False
+
+        return self._exclude is None or self._exclude(item) is None
+
+
+def match_item(item: str, filter_pattern: Sequence[str], case_sensitive: bool = False) -> bool:
     """Check if a string matches one or more fnmatch patterns."""
-    if isinstance(filter_pattern, str):
-        filter_pattern = [filter_pattern]
+    return FilterMatcher(filter_pattern, case_sensitive)(item)
+
+
+class PackedEntries(Sequence[Tuple[str, bool]]):
+    """Scanned (name, is_dir) entries sorted by name, packed into one string with offset and type arrays.
+
+    A tuple and a string object per entry cost over a hundred bytes, packed entries cost about the name length.
+    """
+
+    __slots__ = ('_names', '_offsets', '_types')
+
+    def __init__(self, entries: Iterable[Tuple[str, bool]] = ()):
+        entries = sorted(entries)
+        # No file name can contain NUL, so it separates the names
+        self._names = '\0'.join([name for name, _ in entries])
+        self._offsets = array('I', [0])
+        self._offsets.extend(accumulate(len(name) + 1 for name, _ in entries))
+        self._types = bytes([is_dir for _, is_dir in entries])
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def __getitem__(self, index):  # type: ignore
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+
+        index = range(len(self))[index]
+
+        return self.name(index), self.is_dir(index)
+
+    def __iter__(self) -> Iterator[Tuple[str, bool]]:
+        return zip(self.names(), map(bool, self._types))
+
+    def same_entries(self, other: 'PackedEntries') -> bool:
+        """Check if two scans hold the same entries, comparing the packed strings rather than each name."""
+        return self is other or (self._names == other._names and self._types == other._types)
+
+    def names(self) -> List[str]:
+        """Unpack all names at once, in position order."""
+        return self._names.split('\0') if self._types else []
+
+    def name(self, index: int) -> str:
+        """Get the name at a position."""
+        return self._names[self._offsets[index]:self._offsets[index + 1] - 1]
+
+    def is_dir(self, index: int) -> bool:
+        """Check if the entry at a position is a folder."""
+        return bool(self._types[index])
+
+    def _bisect(self, name: str) -> int:
+        """Get the first position whose name is not smaller than name."""
+        low, high = 0, len(self)
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if self.name(middle) < name:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def find(self, name: str) -> int:
+        """Get the position of a name by binary search, or -1 if it was not scanned."""
+        position = self._bisect(name)
+
+        return position if position < len(self) and self.name(position) == name else -1
+
+    def prefixed(self, prefix: str) -> Iterator[Tuple[str, bool]]:
+        """Iterate over the entries whose name starts with prefix, in name order."""
+        for position in range(self._bisect(prefix), len(self)):
+            name = self.name(position)
+
+            if not name.startswith(prefix):
+                return
+
+            yield name, self.is_dir(position)
+
+
+class DirListing:
+    """Sorted folder contents as positions into the packed scan they were filtered from, folders first.
+
+    Display names are derived when entries are shown instead of being stored.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            entries: PackedEntries,
+            order: Iterable[int],
+            dir_count: int,
+            parent: bool = False,
+            by_name: bool = True,
+            dir_icon: Optional[str] = None,
+            dir_icon_append: bool = False,
+            metadata: Optional[Metadata] = None,
+            show_details: bool = False):
+        self.path = path
+        # The unfiltered scan the listing was made from, for re-filtering without reading the folder
+        self.entries = entries
+        self.metadata = metadata
+        self.parent = parent
+        self.dir_icon = dir_icon
+        self.dir_icon_append = dir_icon_append
+        self.show_details = show_details and metadata is not None
+        self._order = array('I', order)
+        self._dir_count = dir_count
+        self._by_name = by_name
+        # Listing index by scan position, only built for lookups in a listing not sorted by name
+        self._index: Optional[array] = None
+
+    def __len__(self) -> int:
+        return len(self._order) + self.parent
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self.index(name) >= 0
+
+    def entry(self, index: int) -> Tuple[str, bool]:
+        """Get the name and folder flag of the entry at a listing index."""
+        if self.parent:
+            if index == 0:
+                return os.pardir, True
+
+            index -= 1
+
+        position = self._order[index]
+
+        return self.entries.name(position), self.entries.is_dir(position)
+
+    def display_name(self, index: int) -> str:
+        """Get the name shown for the entry at a listing index."""
+        return self._display(*self.entry(index))
+
+    def _display(self, name: str, is_dir: bool) -> str:
+        """Decorate a name with the folder icon and details."""
+        display_name = name
+
+        if is_dir and self.dir_icon:
+            display_name = name + self.dir_icon if self.dir_icon_append else self.dir_icon + name
+
+        if self.show_details:
+            display_name = format_details(display_name, name, self.metadata, not is_dir)  # type: ignore
+
+        return display_name
+
+    def index(self, name: str) -> int:
+        """Get the listing index of a name, or -1 if it is not listed."""
+        if name == os.pardir:
+            return 0 if self.parent else -1
+
+        position = self.entries.find(name)
+
+        if position < 0:
+            return -1
+
+        if self._by_name:
+            # Folders and files are each in scan order, so both runs can be bisected
+            if self.entries.is_dir(position):
+                low, high = 0, self._dir_count
+            else:
+                low, high = self._dir_count, len(self._order)
+
+            index = bisect_left(self._order, position, low, high)
+
+            return index + self.parent if index < high and self._order[index] == position else -1
+
+        if self._index is None:
+            listing_index = array('i', [-1]) * len(self.entries)
+
+            for index, scanned in enumerate(self._order):
+                listing_index[scanned] = index + self.parent
+
+            self._index = listing_index
+
+        return self._index[position]
+
+    def entry_is_dir(self, name: str) -> bool:
+        """Check if a listed entry is a folder."""
+        index = self.index(name)
+
+        return index >= 0 and self.entry(index)[1]
 
-    idx = 0
-    found = False
+    def iter_entries(self) -> Iterator[Tuple[str, bool]]:
+        """Iterate over the names and folder flags in listing order."""
+        if self.parent:
+            yield os.pardir, True
 
-    while idx < len(filter_pattern) and not found:
-        found |= fnmatch.fnmatch(item.lower(), filter_pattern[idx].lower())
-        idx += 1
+        names = self.entries.names()
+        types = self.entries._types
 
-    return found
+        for position in self._order:
+            yield names[position], bool(types[position])
+
+    @property
+    def names(self) -> List[str]:
+        """Get all names in listing order."""
+        return [name for name, _ in self.iter_entries()]
+
+    @property
+    def display_names(self) -> List[str]:
+        """Get all display names in listing order."""
+        if not (self.dir_icon or self.show_details):
+            return self.names
+
+        return [self._display(name, is_dir) for name, is_dir in self.iter_entries()]
+
+    @property
+    def is_dir(self) -> List[bool]:
+        """Get all folder flags in listing order."""
+        return [is_dir for _, is_dir in self.iter_entries()]
+
+
+def entry_is_dir(entry: os.DirEntry) -> bool:
+    """Check if a DirEntry is a folder, following symlinks like os.path.isdir."""
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def get_stat_key(path: str) -> Tuple[int, int, int]:
+    """Get the folder mtime, inode and device used to detect folder changes."""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_ino, st.st_dev)
+
+
+def same_listing(old: DirListing, new: DirListing) -> bool:
+    """Check if two listings of a folder show the same entries, sizes and modification times."""
+    return old.path == new.path and old.entries.same_entries(new.entries) and old.metadata == new.metadata
+
+
+def scan_dir(path: str) -> List[Tuple[str, bool]]:
+    """Read a folder once and return (name, is_dir) tuples."""
+    with os.scandir(path) as entries:
+        return [(entry.name, entry_is_dir(entry)) for entry in entries]
+
+
+def scan_dir_metadata(path: str) -> List[Tuple[str, bool, Optional[int], Optional[int]]]:
+    """Read a folder once and return (name, is_dir, size, mtime_ns) tuples."""
+    rows = []
+
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                st = entry.stat()
+                rows.append((entry.name, entry_is_dir(entry), st.st_size, st.st_mtime_ns))
+            except OSError:
+                # Broken symlinks and entries removed while scanning
+                rows.append((entry.name, False, None, None))
+
+    return rows
+
+
+def scan_dir_batches(path: str, batch_size: int = 1000) -> Iterator[List[Tuple[str, bool]]]:
+    """Read a folder and yield (name, is_dir) tuples in batches as they are read."""
+    batch = []
+
+    with os.scandir(path) as entries:
+        for entry in entries:
+            batch.append((entry.name, entry_is_dir(entry)))
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+
+def filter_entries(
+        entries: PackedEntries,
+        show_hidden: bool = False,
+        show_only_dirs: bool = False,
+        filter_pattern: Optional[Union[Sequence[str], FilterMatcher]] = None) -> Tuple[array, array]:
+    """Split scanned entries into the positions of the folders and files that should be shown, in name order."""
+    files = array('I')
+    dirs = array('I')
+    matcher = None
+
+    if filter_pattern:
+        matcher = filter_pattern if isinstance(filter_pattern, FilterMatcher) else FilterMatcher(filter_pattern)
+
+    for position, (item, is_dir) in enumerate(entries):
+        if item.startswith('.') and not show_hidden:
+            continue
+        if is_dir:
+            dirs.append(position)
+        elif not show_only_dirs:
+            if matcher is None or matcher(item):
+                files.append(position)
+
+    return dirs, files
+
+
+def make_dir_listing(
+        path: str,
+        entries: PackedEntries,
+        dirs: Sequence[int],
+        files: Sequence[int],
+        dir_icon: Optional[str] = None,
+        dir_icon_append: bool = False,
+        top_path: Optional[str] = None,
+        metadata: Optional[Metadata] = None,
+        sort_by: str = 'name',
+        show_details: bool = False) -> DirListing:
+    """Sort filtered folder and file positions into a listing, folders first below the parent folder."""
+    by_name = metadata is None or sort_by == 'name'
+
+    if not by_name:
+        # Newest or largest first, names without metadata last
+        field = 1 if sort_by == 'mtime' else 0
+
+        def sort_key(position: int) -> int:
+            value = metadata.get(entries.name(position), (None, None))[field]  # type: ignore
+            return -value if value is not None else 1
+
+        # Folder sizes say nothing about their contents, so folders keep their name order
+        if sort_by == 'mtime':
+            dirs = sorted(dirs, key=sort_key)
+
+        files = sorted(files, key=sort_key)
+
+    order = array('I', dirs)
+    order.extend(files)
+
+    return DirListing(
+        path,
+        entries,
+        order,
+        len(dirs),
+        parent=has_parent(strip_parent_path(path, top_path)),
+        by_name=by_name,
+        dir_icon=dir_icon,
+        dir_icon_append=dir_icon_append,
+        metadata=metadata,
+        show_details=show_details
+    )
+
+
+def format_size(size: int) -> str:
+    """Format a size in bytes using binary units."""
+    value = float(size)
+
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if value < 1024 or unit == 'TiB':
+            break
+
+        value /= 1024
+
+    return f'{size} B' if unit == 'B' else f'{value:.1f} {unit}'
+
+
+def format_details(display_name: str, name: str, metadata: Metadata, with_size: bool) -> str:
+    """Append the modification time, and optionally the size, to a display name."""
+    size, mtime_ns = metadata.get(name, (None, None))
+    parts = []
+
+    if mtime_ns is not None:
+        parts.append(time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime_ns / 1e9)))
+    if with_size and size is not None:
+        parts.append(format_size(size))
+
+    return f'{display_name}  \u2014 {", ".join(parts)}' if parts else display_name
+
+
+def get_dir_listing(
+        path: str,
+        show_hidden: bool = False,
+        show_only_dirs: bool = False,
+        dir_icon: Optional[str] = None,
+        dir_icon_append: bool = False,
+        filter_pattern: Optional[Union[Sequence[str], FilterMatcher]] = None,
+        top_path: Optional[str] = None,
+        entries: Optional[Iterable[Tuple[str, bool]]] = None) -> DirListing:
+    """Get directory contents in a single scandir pass, or from previously scanned entries."""
+    if entries is None:
+        entries = scan_dir(path)
+
+    if not isinstance(entries, PackedEntries):
+        entries = PackedEntries(entries)
+
+    dirs, files = filter_entries(entries, show_hidden, show_only_dirs, filter_pattern)
+
+    return make_dir_listing(path, entries, dirs, files, dir_icon, dir_icon_append, top_path)
 
 
 def get_dir_contents(
@@ -71,29 +488,20 @@ def get_dir_contents(
         filter_pattern: Optional[Sequence[str]] = None,
         top_path: Optional[str] = None) -> List[str]:
     """Get directory contents."""
-    files = list()
-    dirs = list()
-
-    if os.path.isdir(path):
-        for item in os.listdir(path):
-            append = True
-            if item.startswith('.') and not show_hidden:
-                append = False
-            full_item = os.path.join(path, item)
-            if append and os.path.isdir(full_item):
-                dirs.append(item)
-            elif append and not show_only_dirs:
-                if filter_pattern:
-                    if match_item(item, filter_pattern):
-                        files.append(item)
-                else:
-                    files.append(item)
-        if has_parent(strip_parent_path(path, top_path)):
-            dirs.insert(0, os.pardir)
-    if dir_icon:
-        return prepend_dir_icons(sorted(dirs), dir_icon, dir_icon_append) + sorted(files)
-    else:
-        return sorted(dirs) + sorted(files)
+    try:
+        listing = get_dir_listing(
+            path,
+            show_hidden=show_hidden,
+            show_only_dirs=show_only_dirs,
+            dir_icon=dir_icon,
+            dir_icon_append=dir_icon_append,
+            filter_pattern=filter_pattern,
+            top_path=top_path
+        )
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+    return listing.display_names
 
 
 def prepend_dir_icons(dir_list: Iterable[str], dir_icon: str, dir_icon_append: bool = False) -> List[str]:
@@ -129,11 +537,16 @@ def is_valid_filename(filename: str) -> bool:
     return valid
 
 
-def normalize_path(path: str) -> str:
+def normalize_path(path: str, backend: Optional['FileSystemBackend'] = None) -> str:
     """Normalize a path string."""
-    normalized_path = os.path.realpath(path)
+    if backend is None:
+        normalized_path = os.path.realpath(path)
+        is_dir = os.path.isdir(normalized_path)
+    else:
+        normalized_path = backend.realpath(path)
+        is_dir = backend.isdir(normalized_path)
 
-    if not os.path.isdir(normalized_path):
+    if not is_dir:
         raise InvalidPathError(path)
 
     return normalized_path
@@ -0,0 +1,136 @@
+"""Folder change watchers."""
+import sys
+import threading
+from typing import Callable, Hashable, Optional
+from .backends import FileSystemBackend, LocalBackend, get_default_backend
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+
+class FolderWatcher:
+    """Base class for watchers that report changes to a single folder."""
+
+    def watch(self, path: str, callback: Callable[[str], None]) -> None:
+        """Start watching a folder, replacing the folder watched before."""
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        """Stop watching."""
+        raise NotImplementedError
+
+
+class PollingWatcher(FolderWatcher):
+    """Polls the folder stat key, backing off while the folder does not change."""
+
+    def __init__(
+            self,
+            interval: float = 1.0,
+            max_interval: float = 30.0,
+            backoff: float = 1.5,
+            backend: Optional[FileSystemBackend] = None):
+        self.backend = backend if backend is not None else get_default_backend()
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._stop_event: Optional[threading.Event] = None
+
+    def watch(self, path: str, callback: Callable[[str], None]) -> None:
+        """Start polling a folder, replacing the folder watched before."""
+        self.stop()
+        self._stop_event = threading.Event()
+        threading.Thread(
+            target=self._poll,
+            args=(path, callback, self._stop_event, self._get_key(path)),
+            name='ipyfilechooser-watcher',
+            daemon=True
+        ).start()
+
+    def stop(self) -> None:
+        """Stop polling."""
+        if self._stop_event is not None:
+            self._stop_event.set()
+            self._stop_event = None
+
+    def _get_key(self, path: str) -> Optional[Hashable]:
+        """Get the folder stat key, or None if the folder is gone."""
+        try:
+            return self.backend.stat_key(path)
+        except OSError:
+            return None
+
+    def _poll(
+            self,
+            path: str,
+            callback: Callable[[str], None],
+            stop_event: threading.Event,
+            key: Optional[Hashable]) -> None:
+        """Poll until stopped, resetting the interval after every change."""
+        interval = self.interval
+
+        while not stop_event.wait(interval):
+            new_key = self._get_key(path)
+
+            if new_key != key:
+                key = new_key
+                interval = self.interval
+                callback(path)
+            else:
+                interval = min(interval * self.backoff, self.max_interval)
+
+
+class InotifyWatcher(FolderWatcher):
+    """Uses Linux inotify through the optional inotify_simple package."""
+
+    def __init__(self, debounce: float = 0.2):
+        if inotify_simple is None:
+            raise ImportError('InotifyWatcher requires the inotify_simple package')
+
+        self.debounce = debounce
+        self._stop_event: Optional[threading.Event] = None
+
+    def watch(self, path: str, callback: Callable[[str], None]) -> None:
+        """Start watching a folder, replacing the folder watched before."""
+        self.stop()
+        flags = inotify_simple.flags
+        inotify = inotify_simple.INotify()
+        inotify.add_watch(
+            path,
+            flags.CREATE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO | flags.DELETE_SELF | flags.MOVE_SELF
+        )
+        self._stop_event = threading.Event()
+        threading.Thread(
+            target=self._read,
+            args=(path, callback, inotify, self._stop_event),
+            name='ipyfilechooser-watcher',
+            daemon=True
+        ).start()
+
+    def stop(self) -> None:
+        """Stop watching."""
+        if self._stop_event is not None:
+            self._stop_event.set()
+            self._stop_event = None
+
+    def _read(self, path: str, callback: Callable[[str], None], inotify, stop_event: threading.Event) -> None:
+        """Wait for events until stopped, reporting bursts of events once."""
+        try:
+            while not stop_event.is_set():
+                events = inotify.read(timeout=500, read_delay=int(self.debounce * 1000))
+
+                if events and not stop_event.is_set():
+                    callback(path)
+        finally:
+            inotify.close()
+
+
+def get_default_watcher(backend: Optional[FileSystemBackend] = None) -> FolderWatcher:
+    """Get an inotify watcher for local folders where available, or a polling watcher otherwise."""
+    local = backend is None or isinstance(backend, LocalBackend)
+
+    if local and inotify_simple is not None and sys.platform.startswith('linux'):
+        return InotifyWatcher()
+
+    return PollingWatcher(backend=backend)
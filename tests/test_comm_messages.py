@@ -0,0 +1,70 @@
+"""Comm message budgets for FileChooser navigation.
+
+Front-end changes are simulated with set_state, so the counts include the echo
+and index correction messages ipywidgets sends back for them.
+"""
+import os
+import pytest
+from ipywidgets import Widget
+from ipyfilechooser import FileChooser
+
+
+@pytest.fixture
+def chooser(tmp_path):
+    """A chooser showing a small folder tree, with the dialog open."""
+    os.makedirs(tmp_path / 'sub' / 'deeper')
+
+    for i in range(20):
+        (tmp_path / f'file{i}.txt').touch()
+        (tmp_path / 'sub' / f'file{i}.txt').touch()
+
+    fc = FileChooser(str(tmp_path))
+    fc._show_dialog()
+
+    yield fc
+
+    fc.close()
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Collect the messages widgets send to the front-end."""
+    messages = []
+    monkeypatch.setattr(Widget, '_send', lambda widget, msg, buffers=None: messages.append(
+        (type(widget).__name__, sorted(msg.get('state', {})))
+    ))
+
+    return messages
+
+
+def open_subfolder(fc):
+    """Click a folder in the folder view."""
+    option = fc._model.listing.display_name(fc._model.listing.index('sub'))
+    fc._dircontent.set_state({'index': fc._dircontent.options.index(option)})
+
+
+def go_to_parent(fc):
+    """Pick the parent folder in the path dropdown."""
+    fc._pathlist.set_state({'index': 1})
+
+
+def type_filename(fc):
+    """Type the name of a file in the shown folder."""
+    fc._filename.set_state({'value': 'file1.txt'})
+
+
+@pytest.mark.parametrize('prepare, operation, budget', [
+    (None, open_subfolder, 3),
+    (open_subfolder, go_to_parent, 3),
+    (None, type_filename, 2),
+    (None, FileChooser.refresh, 0),
+    (type_filename, FileChooser.reset, 4),
+], ids=['open subfolder', 'go to parent', 'type filename', 'refresh', 'reset'])
+def test_navigation_message_budget(chooser, sent, prepare, operation, budget):
+    if prepare is not None:
+        prepare(chooser)
+
+    sent.clear()
+    operation(chooser)
+
+    assert len(sent) <= budget, sent